@@ -316,6 +316,17 @@ class Proj5GUI( QMainWindow ):
 				self.totalStates.setText( '{}'.format(results['total']))
 			if 'pruned' in results.keys():
 				self.prunedStates.setText( '{}'.format(results['pruned']))
+			# The 1-tree bound takes up to 5 more seconds, so it is only found when asked for
+			if self.lowerBoundBox.isChecked():
+				self.solver.addLowerBound(results)
+			message = ''
+			if results.get('gap') != None:
+				message = 'Lower bound: {}  Gap: {:.2%}'.format(results['lowerBound'], results['gap'])
+			elif results.get('lowerBound') != None:
+				message = 'Lower bound: {}'.format(results['lowerBound'])
+			if 'solver' in results.keys():
+				message = 'Found by: {}  {}'.format(results['solver'], message)
+			self.statusBar.showMessage(message)
 			#if self._solution:
 			self.displaySolution()
 		else:
@@ -369,7 +380,20 @@ class Proj5GUI( QMainWindow ):
 	ALGORITHMS = [ \
 		('Default                            ','defaultRandomTour'), \
 		('Greedy','greedy'), \
+		('Cheapest Insertion','cheapestInsertion'), \
+		('Farthest Insertion','farthestInsertion'), \
 		('Branch and Bound','branchAndBound'), \
+		('Branch and Bound (Hybrid)','hybridBranchAndBound'), \
+		('Branch and Bound (Assignment)','assignmentBranchAndBound'), \
+		('Branch and Bound (1-Tree)','oneTreeBranchAndBound'), \
+		('Branch and Bound (Parallel)','parallelBranchAndBound'), \
+		('Held-Karp (Exact, Small)','heldKarp'), \
+		('Lin-Kernighan (k-opt)','linKernighan'), \
+		('Genetic Algorithm','genetic'), \
+		('Ant Colony','antColony'), \
+		('Simulated Annealing','simulatedAnnealing'), \
+		('Portfolio (All Solvers)','portfolio'), \
+		('Decomposition (Large)','decomposition'), \
 		('Fancy','fancy') \
 	]															# whitespace hack to get longest to display correctly
 
@@ -394,6 +418,7 @@ class Proj5GUI( QMainWindow ):
 		self.randSeedButton = QPushButton('Randomize Seed')
 		self.generateButton = QPushButton('Generate Scenario')
 		self.solveButton	= QPushButton('Solve TSP')
+		self.lowerBoundBox	= QCheckBox('Lower bound')
 
 		self.curSeed		= QLineEdit('20')
 		self.curSeed.setFixedWidth(100)
@@ -461,6 +486,7 @@ class Proj5GUI( QMainWindow ):
 		h.addWidget( QLabel( 'Time Limit' ) )
 		h.addWidget( self.timeLimit )
 		h.addWidget( QLabel( 'seconds' ) )
+		h.addWidget( self.lowerBoundBox )
 		h.addWidget( self.solveButton )
 		h.addStretch(1)
 		vbox.addLayout(h)
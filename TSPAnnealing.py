@@ -0,0 +1,179 @@
+import math
+import multiprocessing
+import time
+import numpy as np
+from TSPClasses import asCost, routeCosts
+
+# Fewest and most candidate moves scored at once. Each one is scored against the current tour, and the first one
+# accepted is applied, so the chain is the same as trying them one at a time. The batch grows while the moves are
+# mostly rejected (as the temperature drops), so scoring them stays cheap per move.
+ANNEALING_BATCH_SIZE = 64
+ANNEALING_MAX_BATCH_SIZE = 4096
+# Longest segment a segment shift moves (insertion is a shift of one city)
+SEGMENT_SHIFT_MAX_LENGTH = 30
+# Chance an uphill move of typical size is accepted at the start, and the temperature at the deadline as a share of
+# the starting one
+START_ACCEPT_PROBABILITY = 0.1
+END_TEMPERATURE_RATIO = 1e-4
+# Nearest neighbours of each city that a shift may move it (or its segment) next to, and the share of shifts that
+# do so (the rest go anywhere, so the chain can still reach every tour)
+NEAR_NEIGHBORS = 8
+NEAR_SHIFT_PROBABILITY = 0.9
+# Uphill moves sampled to pick the starting temperature
+CALIBRATION_SAMPLES = 1000
+
+# Kinds of move
+SWAP, INSERTION, SEGMENT_SHIFT = 0, 1, 2
+
+# Simulated annealing on a route kept as an array of city indices, Time: O(b) per batch of b moves + O(n) per move made
+# Batches are about twice as long as the run of rejected moves before the last accepted one (see ANNEALING_BATCH_SIZE).
+# Moves swap two cities, move one city (insertion) or move a segment of cities (segment shift), keeping the direction
+# of every edge so asymmetric costs are exact, and each is scored in O(1) from the edges it removes and adds.
+# Most shifts move a segment next to a near neighbour of its first city (see _sampleMoves), where random ones would
+# almost never be accepted once the tour is good.
+# The temperature starts where a typical uphill move is accepted with START_ACCEPT_PROBABILITY and cools
+# geometrically with the share of the time used, reaching END_TEMPERATURE_RATIO of the start at the deadline.
+# Missing edges cost a large finite penalty while annealing, so an infinite seed can still improve.
+# onImprovement(cost), if given, is called with the cost of every new best route as soon as it is found.
+# Returns (best route as city indices, its cost, moves accepted, moves rejected)
+def simulatedAnnealing(costMatrix:np.ndarray, deadline:float, seedRoute:list=None, seed:int=None, startTime:float=None,
+					   onImprovement=None):
+	rng = np.random.default_rng(seed)
+	startTime = time.time() if startTime == None else startTime
+	ncities = len(costMatrix)
+	route = rng.permutation(ncities) if seedRoute is None else np.array(seedRoute, dtype=int)
+	if ncities < 5:
+		return route.tolist(), asCost(routeCosts(costMatrix, route)), 0, 0
+
+	costs = _penalizedCosts(costMatrix)
+	cost = routeCosts(costs, route)
+	neighbors = _nearestNeighbors(costs)
+	positions = np.empty(ncities, dtype=int)
+	positions[route] = np.arange(ncities)
+	bestRoute, bestCost = route.copy(), cost
+	startTemperature = _startTemperature(costs, route, rng)
+	duration = max(deadline - startTime, 1e-9)
+	accepted, rejected = 0, 0
+
+	batchSize = ANNEALING_BATCH_SIZE
+	while time.time() < deadline:
+		temperature = startTemperature * END_TEMPERATURE_RATIO ** min((time.time() - startTime) / duration, 1.0)
+		kinds, first, second, lengths = _sampleMoves(ncities, batchSize, rng, route, positions, neighbors)
+		deltas = _moveDeltas(costs, route, kinds, first, second, lengths)
+		with np.errstate(over='ignore'):
+			acceptable = (deltas <= 0) | (rng.random(batchSize) < np.exp(-deltas / temperature))
+		if not acceptable.any():
+			rejected += batchSize
+			batchSize = min(2 * batchSize, ANNEALING_MAX_BATCH_SIZE)
+			continue
+
+		move = int(acceptable.argmax())
+		batchSize = min(max(2 * (move + 1), ANNEALING_BATCH_SIZE), ANNEALING_MAX_BATCH_SIZE)
+		rejected += move
+		accepted += 1
+		route = _applyMove(route, kinds[move], first[move], second[move], lengths[move])
+		positions[route] = np.arange(ncities)
+		cost += deltas[move]
+		if cost < bestCost:
+			bestRoute, bestCost = route.copy(), cost
+			if onImprovement != None:
+				onImprovement(routeCosts(costMatrix, bestRoute)) # inf while it still uses a missing edge
+
+	return bestRoute.tolist(), asCost(routeCosts(costMatrix, bestRoute)), accepted, rejected
+
+
+# Cost matrix with missing edges (inf) replaced by more than any tour of real edges costs, Time: O(n**2)
+def _penalizedCosts(costMatrix:np.ndarray) -> np.ndarray:
+	finite = np.isfinite(costMatrix)
+	penalty = len(costMatrix) * (costMatrix[finite].max(initial=0) + 1)
+	return np.where(finite, costMatrix, penalty)
+
+
+# Temperature at which the median uphill move is accepted with START_ACCEPT_PROBABILITY, Time: O(CALIBRATION_SAMPLES)
+# Moves that add a missing edge are left out, or on Hard scenarios the penalty would set the temperature
+def _startTemperature(costs:np.ndarray, route:np.ndarray, rng) -> float:
+	deltas = _moveDeltas(costs, route, *_sampleMoves(len(route), CALIBRATION_SAMPLES, rng))
+	uphill = deltas[(deltas > 0) & (deltas < costs.max() / 2)]
+	typical = np.median(uphill) if len(uphill) else 1.0
+	return typical / -math.log(START_ACCEPT_PROBABILITY)
+
+
+# Random moves as arrays of (kind, first position, second position or offset, segment length), Time: O(b)
+# For a swap, second is a position at least two away from first (so the four edges touched are all different). For a
+# shift, the segment starts at first, and second is how far past its end the city it is moved after is.
+# Given the route, each city's position in it and nearest neighbours, NEAR_SHIFT_PROBABILITY of the shifts are aimed.
+def _sampleMoves(ncities:int, count:int, rng, route:np.ndarray=None, positions:np.ndarray=None,
+				 neighbors:np.ndarray=None):
+	kinds = rng.integers(0, 3, size=count)
+	first = rng.integers(0, ncities, size=count)
+	maxLength = min(SEGMENT_SHIFT_MAX_LENGTH, ncities - 2)
+	lengths = np.where(kinds == SEGMENT_SHIFT, rng.integers(1, maxLength + 1, size=count), 1)
+	# A swap partner 2..n-2 positions ahead, or a shift of 0..n-length-2 cities past the segment
+	spans = np.where(kinds == SWAP, ncities - 3, ncities - lengths - 1)
+	offsets = (rng.random(count) * spans).astype(int)
+	second = np.where(kinds == SWAP, (first + 2 + offsets) % ncities, offsets)
+	if neighbors is None:
+		return kinds, first, second, lengths
+
+	# Most shifts put the segment right after one of the nearest neighbours of its first city, when that neighbour
+	# is outside the segment and not already just before it
+	targets = neighbors[route[first], rng.integers(0, neighbors.shape[1], size=count)]
+	nearOffsets = (positions[targets] - first - lengths) % ncities
+	near = (kinds != SWAP) & (nearOffsets <= ncities - lengths - 2) & (rng.random(count) < NEAR_SHIFT_PROBABILITY)
+	second = np.where(near, nearOffsets, second)
+	return kinds, first, second, lengths
+
+
+# The NEAR_NEIGHBORS cheapest cities to go to from each city, Time: O(n**2)
+def _nearestNeighbors(costs:np.ndarray) -> np.ndarray:
+	count = min(NEAR_NEIGHBORS, len(costs) - 1)
+	candidates = np.where(np.eye(len(costs), dtype=bool), np.inf, costs)
+	return np.argpartition(candidates, count - 1, axis=1)[:, :count]
+
+
+# Change in tour cost of each move, Time: O(b)
+def _moveDeltas(costs:np.ndarray, route:np.ndarray, kinds, first, second, lengths) -> np.ndarray:
+	ncities = len(route)
+	before = route[(first - 1) % ncities]
+	start = route[first]
+	isSwap = kinds == SWAP
+
+	# Swap: cities a (at first) and b (at second) trade places between their neighbours
+	swapped = route[second]
+	swapDelta = (costs[before, swapped] + costs[swapped, route[(first + 1) % ncities]]
+				 + costs[route[(second - 1) % ncities], start] + costs[start, route[(second + 1) % ncities]]
+				 - costs[before, start] - costs[start, route[(first + 1) % ncities]]
+				 - costs[route[(second - 1) % ncities], swapped] - costs[swapped, route[(second + 1) % ncities]])
+
+	# Shift: segment start..end moves from between before and after to between c and d
+	end = route[(first + lengths - 1) % ncities]
+	after = route[(first + lengths) % ncities]
+	c = route[(first + lengths + second) % ncities]
+	d = route[(first + lengths + second + 1) % ncities]
+	shiftDelta = (costs[before, after] + costs[c, start] + costs[end, d]
+				  - costs[before, start] - costs[end, after] - costs[c, d])
+	return np.where(isSwap, swapDelta, shiftDelta)
+
+
+# Route after a move, Time: O(1) for a swap, O(n) for a shift
+def _applyMove(route:np.ndarray, kind, first, second, length) -> np.ndarray:
+	if kind == SWAP:
+		route[first], route[second] = route[second], route[first]
+		return route
+	# Rotate so the segment comes first, then put it back after the city second + 1 places into the rest
+	rotated = np.roll(route, -first)
+	segment, rest = rotated[:length], rotated[length:]
+	return np.concatenate((rest[:second + 1], segment, rest[second + 1:]))
+
+
+# Runs one independent chain per process and returns the best, Time: O(b) per batch per chain
+# Returns the same as simulatedAnnealing, with moves accepted and rejected summed over the chains
+def parallelAnnealing(costMatrix:np.ndarray, deadline:float, numWorkers:int, seedRoute:list=None, seed:int=None,
+					  startTime:float=None):
+	startTime = time.time() if startTime == None else startTime
+	seeds = np.random.SeedSequence(seed).generate_state(numWorkers)
+	args = [(costMatrix, deadline, seedRoute, int(chainSeed), startTime) for chainSeed in seeds]
+	with multiprocessing.get_context().Pool(numWorkers) as pool:
+		chains = pool.starmap(simulatedAnnealing, args)
+	route, cost, _, _ = min(chains, key=lambda chain: chain[1])
+	return route, cost, sum(chain[2] for chain in chains), sum(chain[3] for chain in chains)
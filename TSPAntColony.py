@@ -0,0 +1,94 @@
+import math
+import time
+import numpy as np
+from TSPClasses import asCost, routeCosts
+
+# Ants per generation, and the weights of pheromone (ALPHA) and visibility (BETA) when an ant picks its next city
+NUM_ANTS = 20
+ALPHA = 1.0
+BETA = 2.0
+# Chance an ant takes the best looking edge outright instead of sampling one (ant colony system's q0)
+EXPLOIT_PROBABILITY = 0.9
+# Share of the pheromone that evaporates each generation (RHO), and that each step an ant takes pulls back toward
+# the starting level (XI, so ants in the same generation spread out)
+RHO = 0.1
+XI = 0.1
+
+# Ant colony system, Time: O(m*n**2) per generation of m ants, Space: O(n**2)
+# Pheromone and visibility (1/cost, so 0 for missing edges and self-edges) are n x n matrices. Each generation every
+# ant starts at a random city and all of them take a step together: each ant takes its best looking edge (pheromone
+# ** ALPHA * visibility ** BETA) with EXPLOIT_PROBABILITY, or else samples one in proportion to how good it looks, and
+# the pheromone on the edges just used is pulled back toward the starting level. After the generation all pheromone
+# evaporates by RHO and the best route so far gets RHO / its cost added to its edges, each one array operation.
+# Edges keep their direction, so asymmetric (Normal/Hard) costs are handled as they are.
+# onImprovement(cost), if given, is called with the best cost each time it improves.
+# Returns (best route as city indices, its cost, number of generations, number of times the best route improved)
+def antColony(costMatrix:np.ndarray, deadline:float, seedRoute:list=None, numAnts:int=NUM_ANTS, seed:int=None,
+			  onImprovement=None):
+	rng = np.random.default_rng(seed)
+	ncities = len(costMatrix)
+	with np.errstate(divide='ignore'):
+		visibility = np.where(np.isfinite(costMatrix) & (costMatrix > 0), 1.0 / costMatrix, 0.0)
+	# Edges that cost 0 look better than any other
+	visibility[costMatrix == 0] = 2.0 * visibility.max(initial=1.0)
+	np.fill_diagonal(visibility, 0.0)
+	visibilityWeight = visibility ** BETA
+
+	bestRoute, bestCost = None, math.inf
+	if seedRoute is not None:
+		bestRoute = np.asarray(seedRoute)
+		bestCost = routeCosts(costMatrix, bestRoute)
+	# Starting pheromone of 1 / (n * a reasonable tour's cost), as in ant colony system
+	startLevel = 1.0 / (ncities * (bestCost if 0 < bestCost < math.inf else ncities * costMatrix[np.isfinite(costMatrix)].mean()))
+	pheromone = np.full((ncities, ncities), startLevel)
+	generations, improvements = 0, 0
+
+	while (generations == 0 or time.time() < deadline) and ncities > 1:
+		routes = _buildRoutes(pheromone, visibilityWeight, numAnts, startLevel, rng)
+		costs = routeCosts(costMatrix, routes)
+		generations += 1
+		best = int(costs.argmin())
+		if costs[best] < bestCost or bestRoute is None:
+			bestRoute, bestCost = routes[best], costs[best]
+			improvements += 1
+			if onImprovement != None:
+				onImprovement(bestCost)
+
+		# Evaporate everywhere, then lay pheromone on the best route so far
+		pheromone *= 1.0 - RHO
+		if bestCost < math.inf:
+			pheromone[bestRoute, np.roll(bestRoute, -1)] += RHO / max(bestCost, 1)
+
+	return bestRoute.tolist(), asCost(bestCost), generations, improvements
+
+
+# Builds one route per ant, all ants taking each step together, Time: O(m*n**2)
+# Updates the pheromone on the edges used (the local update) as it goes
+def _buildRoutes(pheromone:np.ndarray, visibilityWeight:np.ndarray, numAnts:int, startLevel:float, rng) -> np.ndarray:
+	ncities = len(pheromone)
+	ants = np.arange(numAnts)
+	routes = np.empty((numAnts, ncities), dtype=int)
+	routes[:, 0] = rng.integers(0, ncities, size=numAnts)
+	unvisited = np.ones((numAnts, ncities), dtype=bool)
+	unvisited[ants, routes[:, 0]] = False
+
+	for step in range(1, ncities):
+		current = routes[:, step - 1]
+		weights = (pheromone[current] ** ALPHA) * visibilityWeight[current] * unvisited
+		totals = weights.sum(axis=1)
+		# Best looking edge, or one sampled in proportion to the weights (a threshold on the running sum)
+		nextCities = weights.argmax(axis=1)
+		explore = rng.random(numAnts) >= EXPLOIT_PROBABILITY
+		if explore.any():
+			thresholds = rng.random(int(explore.sum())) * totals[explore]
+			sampled = (np.cumsum(weights[explore], axis=1) <= thresholds[:, np.newaxis]).sum(axis=1)
+			nextCities[explore] = np.minimum(sampled, ncities - 1)
+		# Ants with no usable edge left (or that sampled past the end) take any unvisited city
+		stuck = (totals == 0) | ~unvisited[ants, nextCities]
+		if stuck.any():
+			nextCities[stuck] = unvisited[stuck].argmax(axis=1)
+
+		routes[:, step] = nextCities
+		unvisited[ants, nextCities] = False
+		pheromone[current, nextCities] = (1.0 - XI) * pheromone[current, nextCities] + XI * startLevel
+	return routes
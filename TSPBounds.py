@@ -0,0 +1,222 @@
+import math
+import time
+import numpy as np
+
+# Subgradient iterations for the Held-Karp 1-tree bound, and how many in a row may fail to improve it before the step shrinks
+ONE_TREE_ITERATIONS = 100
+ONE_TREE_PATIENCE = 5
+
+# Bounding functions for branch and bound: each one gives a lower bound on every tour that extends an ArrayState.
+# evaluate(state, parentState) may keep per-State data in state.boundData, so a child's bound can be updated from
+# its parent's instead of being recomputed (the data is cleared whenever the State is changed by visitCity).
+
+# The reduced cost matrix bound, which every ArrayState already keeps up to date as its costSoFar, Time: O(1)
+class ReducedCostBound(object):
+	name = 'reduced'
+	refinesReducedCost = False # True if the bound can be above costSoFar (so children have to be built to evaluate it)
+
+	def __init__(self, costMatrix:np.ndarray=None, upperBound=math.inf):
+		pass
+
+	def evaluate(self, state, parentState=None):
+		return state.costSoFar
+
+
+# Assignment problem bound: the cheapest way to give every city left on the route exactly one outbound and one
+# inbound edge (a tour is one such assignment, without subtours), solved by the Hungarian algorithm, Space: O(n)
+# The assignment is solved on the original costs of the edges still in the reduced matrix. Those differ from the
+# reduced costs by a constant per row/column, so the same assignment is optimal for both and the bound is
+# costSoFar + (its reduced cost), which is never less than costSoFar.
+# boundData holds the dual potentials and the assignment. They stay optimal for the child after removing the row,
+# column and inverse edge that visitCity removes, so only the (at most 2) rows that lost their edge are re-assigned,
+# Time: O(n**2) per child instead of O(n**3) from scratch.
+class AssignmentBound(object):
+	name = 'assignment'
+	refinesReducedCost = True
+
+	def __init__(self, costMatrix:np.ndarray, upperBound=math.inf):
+		self.costMatrix:np.ndarray = costMatrix
+
+	def evaluate(self, state, parentState=None):
+		if state.costSoFar == math.inf:
+			return math.inf
+		liveEdges = np.isfinite(state.matrix)
+		liveRows = np.flatnonzero(liveEdges.any(axis=1))
+		# A city with no way out left can't be part of a tour
+		if len(liveRows) != len(state.unvisitedCitiesSet) + 1:
+			return math.inf
+		cost = np.where(liveEdges, self.costMatrix, math.inf)
+
+		if parentState != None and parentState.boundData != None:
+			u, v, rowToCol, colToRow = [array.copy() for array in parentState.boundData]
+			# Drop the assignments that use an edge that is gone (the removed row, column and inverse edge)
+			for row in np.flatnonzero(rowToCol >= 0):
+				if not liveEdges[row, rowToCol[row]]:
+					colToRow[rowToCol[row]] = -1
+					rowToCol[row] = -1
+		else:
+			ncities = len(cost)
+			u, v = np.zeros(ncities), np.zeros(ncities)
+			rowToCol, colToRow = np.full(ncities, -1), np.full(ncities, -1)
+
+		for row in liveRows[rowToCol[liveRows] == -1]:
+			if not _augment(cost, u, v, rowToCol, colToRow, row): # Time: O(n**2)
+				return math.inf
+
+		state.boundData = (u, v, rowToCol, colToRow)
+		return state.costSoFar + int(state.matrix[liveRows, rowToCol[liveRows]].sum())
+
+
+# Held-Karp 1-tree bound for a partial route: the rest of a tour is a path from the last city through the unvisited
+# cities U back to the start, which is at least a spanning tree of U plus the cheapest edge into U from the last city
+# and out of U to the start, Time: O(n**2) per State
+# Edges are taken as undirected with cost min(c(i, j), c(j, i)), which makes the bound valid for asymmetric scenarios too
+# (it is tightest for symmetric, Easy ones). Node penalties from the Lagrangian subgradient search at the root
+# (see oneTreeLowerBound) are added to every edge into a city and subtracted twice per city, which tightens the tree
+# without changing the cost of any tour.
+class OneTreeBound(object):
+	name = 'oneTree'
+	refinesReducedCost = True
+
+	def __init__(self, costMatrix:np.ndarray, upperBound=math.inf):
+		self.costMatrix:np.ndarray = costMatrix
+		self.symmetricCost:np.ndarray = np.minimum(costMatrix, costMatrix.T)
+		_, self.penalties = oneTreeLowerBound(costMatrix, upperBound)
+
+	def evaluate(self, state, parentState=None):
+		if state.costSoFar == math.inf or len(state.unvisitedCitiesSet) == 0:
+			return state.costSoFar
+		route = np.array([city._index for city in state.routeSoFar])
+		pathCost = self.costMatrix[route[:-1], route[1:]].sum()
+		unvisited = np.array([city._index for city in state.unvisitedCitiesSet])
+
+		penalties = self.penalties[unvisited]
+		cost = self.symmetricCost[np.ix_(unvisited, unvisited)] + penalties[:, np.newaxis] + penalties[np.newaxis, :]
+		treeCost, _ = _minimumSpanningTree(cost) # Time: O(n**2)
+		fromLast = (self.symmetricCost[route[-1], unvisited] + penalties).min()
+		toStart = (self.symmetricCost[unvisited, route[0]] + penalties).min()
+		bound = pathCost + treeCost + fromLast + toStart - 2*penalties.sum()
+		if bound == math.inf:
+			return math.inf
+		# Tour costs are integers (the small margin absorbs float rounding in the penalties)
+		return max(state.costSoFar, int(math.ceil(bound - 1e-6)))
+
+
+# Held-Karp lower bound on every tour: a minimum 1-tree (a spanning tree of cities 1..n-1 plus the two cheapest
+# edges at city 0) with node penalties tuned by subgradient optimization, Time: O(i*n**2) for i iterations
+# Costs are taken as undirected (see OneTreeBound). upperBound (e.g. a known tour's cost) sets the step size.
+# The first 1-tree is always built, so a deadline that has already passed still gives the unpenalized bound
+# Returns (the bound, rounded up to an integer, or 0 with no iterations; the penalties that gave it)
+def oneTreeLowerBound(costMatrix:np.ndarray, upperBound=math.inf, iterations:int=ONE_TREE_ITERATIONS, deadline:float=math.inf):
+	ncities = len(costMatrix)
+	symmetricCost = np.minimum(costMatrix, costMatrix.T)
+	penalties = np.zeros(ncities)
+	if ncities < 3:
+		return 0, penalties
+	bestBound, bestPenalties = -math.inf, penalties.copy()
+	stepScale, sinceImproved = 2.0, 0
+
+	for iteration in range(iterations):
+		if iteration > 0 and time.time() >= deadline:
+			break
+		cost = symmetricCost + penalties[:, np.newaxis] + penalties[np.newaxis, :]
+		treeCost, degrees = _minimumSpanningTree(cost[1:, 1:]) # Time: O(n**2)
+		# The two cheapest edges at city 0 close the 1-tree
+		closing = np.argpartition(cost[0, 1:], 1)[:2]
+		bound = treeCost + cost[0, 1:][closing].sum() - 2*penalties.sum()
+		if bound == math.inf:
+			return math.inf, penalties # Not even connected, so there is no tour
+
+		if bound > bestBound:
+			bestBound, bestPenalties, sinceImproved = bound, penalties.copy(), 0
+		else:
+			sinceImproved += 1
+			if sinceImproved >= ONE_TREE_PATIENCE:
+				stepScale, sinceImproved = stepScale / 2, 0
+
+		# Push every city's degree toward 2: a 1-tree where they are all 2 is a tour, so the bound is optimal
+		degrees = np.concatenate(([2], degrees))
+		degrees[1 + closing] += 1
+		subgradient = degrees - 2
+		norm = (subgradient**2).sum()
+		if norm == 0:
+			break
+		gap = upperBound - bound if upperBound != math.inf else 0.01 * abs(bound)
+		penalties = penalties + stepScale * max(gap, 1.0) / norm * subgradient
+
+	if bestBound == -math.inf:
+		return 0, bestPenalties
+	return int(math.ceil(bestBound - 1e-6)), bestPenalties
+
+
+# Prim's algorithm on a dense symmetric cost matrix, one vectorized pass per city, Time: O(n**2)
+# Returns (total cost, degree of each city in the tree); the cost is math.inf if the cities aren't connected
+def _minimumSpanningTree(cost:np.ndarray):
+	ncities = len(cost)
+	degrees = np.zeros(ncities, dtype=int)
+	if ncities <= 1:
+		return 0.0, degrees
+	inTree = np.zeros(ncities, dtype=bool)
+	inTree[0] = True
+	dist = cost[0].copy()
+	dist[0] = math.inf
+	nearest = np.zeros(ncities, dtype=int)
+	total = 0.0
+	for _ in range(ncities - 1):
+		city = int(np.argmin(dist))
+		if dist[city] == math.inf:
+			return math.inf, degrees
+		total += dist[city]
+		degrees[city] += 1
+		degrees[nearest[city]] += 1
+		inTree[city] = True
+		dist[city] = math.inf
+		closer = ~inTree & (cost[city] < dist)
+		dist[closer] = cost[city][closer]
+		nearest[closer] = city
+	return total, degrees
+
+
+# Assigns the free row by the shortest augmenting path in the reduced costs (cost - u - v), then updates the
+# potentials so they stay dual feasible, returns False if the row can't be assigned at all, Time: O(n**2)
+# (Costs must be non-negative, so zero potentials are a valid start; removing edges keeps them valid)
+def _augment(cost:np.ndarray, u:np.ndarray, v:np.ndarray, rowToCol:np.ndarray, colToRow:np.ndarray, freeRow:int) -> bool:
+	ncities = len(cost)
+	dist = cost[freeRow] - u[freeRow] - v
+	prevRow = np.full(ncities, freeRow)
+	scanned = np.zeros(ncities, dtype=bool)
+	scannedRows = [freeRow]
+
+	# Dijkstra over the columns, Time: O(n**2)
+	while True:
+		col = int(np.argmin(np.where(scanned, math.inf, dist)))
+		shortest = dist[col]
+		if shortest == math.inf or scanned[col]:
+			return False
+		scanned[col] = True
+		row = colToRow[col]
+		if row == -1:
+			break
+		scannedRows.append(row)
+		newDist = shortest + cost[row] - u[row] - v
+		better = ~scanned & (newDist < dist)
+		dist[better] = newDist[better]
+		prevRow[better] = row
+
+	# Update the potentials so every reduced cost stays >= 0 and the new path's reduced costs are 0
+	u[freeRow] += shortest
+	for row in scannedRows[1:]:
+		u[row] += shortest - dist[rowToCol[row]]
+	v[scanned] -= shortest - dist[scanned]
+
+	# Flip the assignments along the path
+	while True:
+		row = prevRow[col]
+		nextCol = rowToCol[row]
+		rowToCol[row], colToRow[col] = col, row
+		if row == freeRow:
+			return True
+		col = nextCol
+
+
+BOUND_FUNCTIONS = {bound.name: bound for bound in [ReducedCostBound, AssignmentBound, OneTreeBound]}
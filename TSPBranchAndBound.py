@@ -1,23 +1,87 @@
 import math
-from TSPClasses import City
+import time
+import numpy as np
+from collections import OrderedDict
+from heapq import heapify, heappop, heappush, nsmallest
+from itertools import count
+from TSPBounds import ReducedCostBound
+from TSPClasses import City, costMatrixForCities
 from copy import copy, deepcopy
 
 INF_STRING = "-"
 
-# Space: O(1)
-class PriorityEntry(object):
-	def __init__(self, numVisited:int, costSoFar:int, data):
-			self.data = data
-			self.numVisited:int = numVisited
-			self.costSoFar:int = costSoFar
+# Priority queue of States for branch and bound, deepest first and then lowest bound, Space: O(qlen)
+# Entries are (-numVisited, bound, tiebreak, State) tuples so heapq compares them in C (the tiebreak counter
+# is unique, so the State itself is never compared), and there is no locking since the search is single threaded
+class Frontier(object):
+	def __init__(self):
+		self._heap:list = []
+		self._tiebreak = count()
 
-	def __lt__(self, other): #less than
-			if self.numVisited == other.numVisited:
-				return self.costSoFar < other.costSoFar
-			return self.numVisited > other.numVisited
+	# Time: O(log(qlen))
+	def push(self, numVisited:int, bound:int, state):
+		heappush(self._heap, (-numVisited, bound, next(self._tiebreak), state))
+
+	# Removes and returns the highest priority State, Time: O(log(qlen))
+	def pop(self):
+		return heappop(self._heap)[3]
+
+	# Time: O(1)
+	def __len__(self) -> int:
+		return len(self._heap)
+
+	# Removes and returns up to k of the shallowest (then cheapest) States, the biggest subtrees to hand off, Time: O(qlen)
+	def removeShallowest(self, k:int) -> list:
+		entries = nsmallest(k, self._heap, key=lambda entry: (-entry[0], entry[1]))
+		removed = set(entry[2] for entry in entries)
+		self._heap = [entry for entry in self._heap if entry[2] not in removed]
+		heapify(self._heap)
+		return [entry[3] for entry in entries]
+
+	# Smallest bound of any queued State (math.inf if empty), Time: O(qlen) since the heap is ordered by depth first
+	def minBound(self):
+		return min((entry[1] for entry in self._heap), default=math.inf)
+
+# Cheapest path cost seen for each (visited cities, last city) pair, Space: O(maxSize)
+# Paths that start at the start city, visit the same cities and end at the same city can all be finished the same
+# ways, so only the cheapest one is worth searching. Least recently used entries are dropped past maxSize.
+class TranspositionTable(object):
+	#maxSize:int, most entries kept
+	#hits:int, paths found dominated by a recorded one
+	def __init__(self, maxSize:int):
+		self._table = OrderedDict()
+		self.maxSize:int = maxSize
+		self.hits:int = 0
+
+	# Records the path, returns False (a hit) if a path at least as cheap got there first, Time: O(1)
+	def record(self, visitedMask:int, lastCity:int, pathCost) -> bool:
+		key = (visitedMask, lastCity)
+		recorded = self._table.get(key)
+		if recorded != None:
+			self._table.move_to_end(key)
+			if recorded <= pathCost:
+				self.hits += 1
+				return False
+		self._table[key] = pathCost
+		if len(self._table) > self.maxSize:
+			self._table.popitem(last=False)
+		return True
+
+	# True (a hit) if a strictly cheaper path was recorded after this one, Time: O(1)
+	def isDominated(self, visitedMask:int, lastCity:int, pathCost) -> bool:
+		recorded = self._table.get((visitedMask, lastCity))
+		if recorded != None and recorded < pathCost:
+			self.hits += 1
+			return True
+		return False
+
+	# Time: O(1)
+	def __len__(self) -> int:
+		return len(self._table)
 
 # Keeps track/adjusts the current route, matrix and cost when adding new cities to the route, Space: O(n)
 class State:
+	__slots__ = ('unvisitedCitiesSet', 'matrix', 'cities', 'routeSoFar', 'costSoFar', '_isReturnVisitToStart')
 	#unvisitedCitiesSet:set, set of cities that haven't been visited yet
 	#matrix:dict(tuple(rowIndex, colIndex):reducedCost), dictionary to show which edges can be used next (inf entries do not exist)
 	#cities:list[City], reference to the list of all cities
@@ -44,15 +108,10 @@ class State:
 		# Route should include the start node
 		self.routeSoFar = [self.cities[0]]
 
-		#Initialize the matrix, Time: O(n**2)
-		matrix = dict()
-		for city in self.cities:
-			for otherCity in self.cities:
-				if city != otherCity:
-					cost = city.costTo(otherCity)
-					if cost != math.inf:
-						matrix[tuple((city._index, otherCity._index))] = cost
-		self.matrix = matrix
+		#Initialize the matrix from the finite entries of the cost matrix, Time: O(n**2)
+		costMatrix = costMatrixForCities(self.cities)
+		rows, cols = np.nonzero(np.isfinite(costMatrix))
+		self.matrix = dict(zip(zip(rows.tolist(), cols.tolist()), costMatrix[rows, cols].astype(np.int64).tolist()))
 		self._reduceCostOnMatrix() # Time: O(n**2)
 
 	# Returns true if route is impossible or not going to yield a better result, Time: O(1)
@@ -218,6 +277,10 @@ class State:
 		string += '\n'
 		return string
 	
+	# Returns the reduced cost of a cell, or None if it is infinite, Time: O(1)
+	def _getCell(self, rowIndex:int, colIndex:int):
+		return self.matrix.get(tuple((rowIndex, colIndex)))
+
 	def str_matrix(self):
 		string = 'Matrix:\n'
 		# Format the matrix printing
@@ -240,9 +303,9 @@ class State:
 				# Print the same city -> same city as inf
 				elif colIndex == rowIndex:
 					table_data[last].append(INF_STRING)
-				# Lookup in dictionary and see if it exists
+				# Lookup in matrix and see if it exists
 				else:
-					cost = self.matrix.get(tuple((rowIndex, colIndex)))
+					cost = self._getCell(rowIndex, colIndex)
 					if cost != None:
 						table_data[last].append(f"{cost}")
 					else:
@@ -261,4 +324,510 @@ class State:
 		string += self.str_costSoFar()
 		string += self.str_unvisitedCitiesSet()
 		string += self.str_matrix()
-		return string
\ No newline at end of file
+		return string
+
+# Same as State, but the reduced cost matrix is a 2-D NumPy array (np.inf marks an edge that can't be used),
+# so reducing, visiting and copying are whole-array operations instead of per-cell dict work, Space: O(n**2)
+class ArrayState(State):
+	__slots__ = ('boundData',)
+	#matrix:np.ndarray(n, n), reduced cost of each edge (rowIndex -> colIndex), np.inf if the edge is not available
+	#boundData:object, whatever the bounding function (see TSPBounds) kept about this State, None once the State changes
+
+	def __init__(self, *args, **kwargs):
+		self.boundData = None
+		super().__init__(*args, **kwargs)
+
+	# Given a list of cities, return an init state with the first city as the start, Time: O(n**2)
+	# (costMatrix defaults to the cities' own cost matrix)
+	def _generateRootStateFromCities(self, costMatrix:np.ndarray=None):
+		# Unvisited cities should exclude the start node, so it is not revisited before the end
+		self.unvisitedCitiesSet = set(self.cities[1:])
+
+		# Route should include the start node
+		self.routeSoFar = [self.cities[0]]
+
+		# Initialize the matrix with a copy of the cost matrix, Time: O(n**2)
+		if costMatrix is None:
+			costMatrix = costMatrixForCities(self.cities)
+		self.matrix = np.array(costMatrix, dtype=float)
+		self._reduceCostOnMatrix() # Time: O(n**2)
+
+	# Sees if this State yields a solution, Time: O(1) (O(n**2) only once the route is complete)
+	def isSolution(self) -> bool:
+		return len(self.unvisitedCitiesSet) == 0 and self.costSoFar != math.inf and self._isReturnVisitToStart and not np.isfinite(self.matrix).any()
+
+	# Subtracts the smallest finite cost from every row, then every column, adding them to costSoFar, Time: O(n**2)
+	def _reduceCostOnMatrix(self):
+		# Rows/columns that are all infinities have nothing to reduce
+		rowMins = self.matrix.min(axis=1)
+		rowMins[rowMins == math.inf] = 0
+		self.matrix -= rowMins[:, np.newaxis]
+
+		colMins = self.matrix.min(axis=0)
+		colMins[colMins == math.inf] = 0
+		self.matrix -= colMins[np.newaxis, :]
+
+		self.costSoFar += int(rowMins.sum() + colMins.sum())
+
+	# Reduces only the given rows, then the given columns, adding the minimums to costSoFar, Time: O(n*k) for k lines
+	# (k is usually tiny, so looping over row/column views is cheaper than gathering them with fancy indexing)
+	# Each reduction is appended to reductions as (isRow, index, amount) if a list is given
+	def _reduceLines(self, rows:list, cols:list, reductions:list=None):
+		for row in rows:
+			rowMin = self.matrix[row, :].min()
+			# Only rows that lost all their zeros (but still have a finite cell) need to change
+			if rowMin != 0 and rowMin != math.inf:
+				self.matrix[row, :] -= rowMin
+				self.costSoFar += int(rowMin)
+				if reductions != None:
+					reductions.append((True, row, rowMin))
+
+		for col in cols:
+			colMin = self.matrix[:, col].min()
+			if colMin != 0 and colMin != math.inf:
+				self.matrix[:, col] -= colMin
+				self.costSoFar += int(colMin)
+				if reductions != None:
+					reductions.append((False, col, colMin))
+
+	# Marks the city as visited, updates the matrix and then re-reduces the rows/columns that lost their zero, Time: O(n*k)
+	# The matrix is always fully reduced (every row/column min is 0), so a row/column's min can only change if
+	# a removed cell held one of its zeros; any other row/column still has a zero and needs no work
+	# If undoLog is given, a record of the changes is appended so undoVisit can revert them in place
+	def visitCity(self, cityToVisit:City, undoLog:list=None):
+		self.boundData = None
+		if undoLog != None:
+			undoLog.append((self.costSoFar, None))
+		if (self.costSoFar == math.inf or self._isReturnVisitToStart):
+			return
+		assert(len(self.routeSoFar) != 0)
+		prevIndex = self.routeSoFar[len(self.routeSoFar)-1]._index
+		visitIndex = cityToVisit._index
+
+		# Ensure that there is actually a path to the other city
+		cost = self.matrix[prevIndex, visitIndex]
+		if cost == math.inf:
+			self.costSoFar = math.inf
+			return
+		reductions = None
+		if undoLog != None:
+			reductions = []
+			undoLog[-1] = (undoLog[-1][0], cityToVisit, prevIndex, self.matrix[prevIndex, :].copy(),
+						   self.matrix[:, visitIndex].copy(), self.matrix[visitIndex, prevIndex], reductions)
+
+		# Update cost after traveling to city
+		self.costSoFar += int(cost)
+
+		# Find the rows/columns whose zeros are about to be removed, Time: O(n)
+		affectedRows = np.nonzero(self.matrix[:, visitIndex] == 0)[0].tolist()
+		affectedCols = np.nonzero(self.matrix[prevIndex, :] == 0)[0].tolist()
+		if self.matrix[visitIndex, prevIndex] == 0:
+			affectedRows.append(visitIndex)
+			affectedCols.append(prevIndex)
+
+		# Remove row prevCity, col cityToVisit and the inverse (cityToVisit -> prevCity), Time: O(n)
+		self.matrix[prevIndex, :] = math.inf
+		self.matrix[:, visitIndex] = math.inf
+		self.matrix[visitIndex, prevIndex] = math.inf
+
+		# Only allowed to visit the startCity after visiting all other cities
+		if cityToVisit == self.cities[0]:
+			assert(len(self.unvisitedCitiesSet) == 0)
+			self._isReturnVisitToStart = True
+		else:
+			self.unvisitedCitiesSet.remove(cityToVisit)
+			self.routeSoFar.append(cityToVisit)
+			self._reduceLines(affectedRows, affectedCols, reductions) # Time: O(n*k)
+
+	# Bound (costSoFar after visitCity) of every child at once, by reducing a stack of the children's matrices, Time: O(k*n**2)
+	# Returns (the unvisited cities, their bounds as an array); the children are computed maxBatchCells at a time
+	def childBounds(self, maxBatchCells:int=2**22):
+		childCities = list(self.unvisitedCitiesSet)
+		bounds = np.empty(len(childCities))
+		prevIndex = self.routeSoFar[len(self.routeSoFar)-1]._index
+		batchSize = max(1, maxBatchCells // self.matrix.size)
+
+		for start in range(0, len(childCities), batchSize):
+			visitIndices = np.array([city._index for city in childCities[start:start+batchSize]])
+			batch = np.arange(len(visitIndices))
+
+			# Same removals as visitCity, one child matrix per layer of the stack
+			matrices = np.repeat(self.matrix[np.newaxis, :, :], len(visitIndices), axis=0)
+			matrices[:, prevIndex, :] = math.inf
+			matrices[batch, :, visitIndices] = math.inf
+			matrices[batch, visitIndices, prevIndex] = math.inf
+
+			# Same reduction as _reduceCostOnMatrix, on every layer at once
+			rowMins = matrices.min(axis=2)
+			rowMins[rowMins == math.inf] = 0
+			matrices -= rowMins[:, :, np.newaxis]
+			colMins = matrices.min(axis=1)
+			colMins[colMins == math.inf] = 0
+
+			# An infinite edge to the child makes its bound infinite
+			bounds[start:start+len(visitIndices)] = self.costSoFar + self.matrix[prevIndex, visitIndices] + rowMins.sum(axis=1) + colMins.sum(axis=1)
+		return childCities, bounds
+
+	# Reverts the most recent visitCity that was given this undoLog, Time: O(n*k)
+	def undoVisit(self, undoLog:list):
+		record = undoLog.pop()
+		self.boundData = None
+		self.costSoFar = record[0]
+		cityToVisit = record[1]
+		if cityToVisit == None:
+			return
+		_, _, prevIndex, prevRow, visitCol, inverseCost, reductions = record
+		visitIndex = cityToVisit._index
+
+		# Add the reductions back, then restore the removed cells in the opposite order they were removed
+		for isRow, index, amount in reversed(reductions):
+			if isRow:
+				self.matrix[index, :] += amount
+			else:
+				self.matrix[:, index] += amount
+		self.matrix[visitIndex, prevIndex] = inverseCost
+		self.matrix[:, visitIndex] = visitCol
+		self.matrix[prevIndex, :] = prevRow
+
+		if cityToVisit == self.cities[0]:
+			self._isReturnVisitToStart = False
+		else:
+			self.unvisitedCitiesSet.add(cityToVisit)
+			self.routeSoFar.pop()
+
+	# Makes a shallow copy of all the elements (the matrix array is copied, cities are referenced), Time: O(n**2)
+	def copy(self):
+		result = ArrayState()
+		result.unvisitedCitiesSet:set = set(self.unvisitedCitiesSet)
+		result.matrix:np.ndarray = self.matrix.copy()
+		result.cities:list[City] = self.cities
+		result.routeSoFar:list[City] = copy(self.routeSoFar)
+		result.costSoFar:int = self.costSoFar
+		result._isReturnVisitToStart:bool = self._isReturnVisitToStart
+		result.boundData = self.boundData
+		return result
+
+	# Returns the reduced cost of a cell, or None if it is infinite, Time: O(1)
+	def _getCell(self, rowIndex:int, colIndex:int):
+		cost = self.matrix[rowIndex, colIndex]
+		return None if cost == math.inf else int(cost)
+
+
+# Root ArrayState for cities whose costs are given directly (e.g. cities copied into another process), Time: O(n**2)
+def rootStateFromCostMatrix(cities:list[City], costMatrix:np.ndarray) -> ArrayState:
+	state = ArrayState()
+	state.cities = cities
+	state._generateRootStateFromCities(costMatrix)
+	return state
+
+
+# Compact stand-in for a queued State: only the edge taken from the parent node is stored, Space: O(1)
+# The reduced matrix, route and unvisited set are rebuilt (materialized) from the root when the node is expanded,
+# so queued states cost a few dozen bytes instead of an O(n**2) matrix each
+class StateNode(object):
+	__slots__ = ('parent', 'cityIndex', 'costSoFar', 'pathCost', 'numVisited', 'visitedMask')
+	#parent:StateNode, node this one was expanded from (None for the root)
+	#cityIndex:int, index of the city visited to get here from the parent (the start city for the root)
+	#costSoFar:int, bound of the State when it was created
+	#pathCost:int, actual cost of the edges on the route so far
+	#numVisited:int, length of the route so far
+	#visitedMask:int, bit i is set if city i is on the route so far
+
+	def __init__(self, parent, cityIndex:int, costSoFar:int, pathCost:int=0):
+		self.parent = parent
+		self.cityIndex:int = cityIndex
+		self.costSoFar:int = costSoFar
+		self.pathCost:int = pathCost
+		if parent is None:
+			self.numVisited:int = 1
+			self.visitedMask:int = 1 << cityIndex
+		else:
+			self.numVisited:int = parent.numVisited + 1
+			self.visitedMask:int = parent.visitedMask | (1 << cityIndex)
+
+	# Same as State.shouldPrune, Time: O(1)
+	def shouldPrune(self, bssf:int=math.inf) -> bool:
+		return self.costSoFar == math.inf or self.costSoFar >= bssf
+
+	# Indices of the cities visited after the start city, in order, Time: O(d)
+	def routeIndices(self) -> list:
+		cityIndices = []
+		node = self
+		while node.parent is not None:
+			cityIndices.append(node.cityIndex)
+			node = node.parent
+		cityIndices.reverse()
+		return cityIndices
+
+	# Rebuilds the full State by replaying the route from the root State, Time: O(d*n*k) for d cities replayed
+	# If an ancestor is in cachedStates (node -> its materialized State), only the cities after it are replayed
+	def materialize(self, rootState:ArrayState, cachedStates:dict=None) -> ArrayState:
+		cachedStates = {} if cachedStates is None else cachedStates
+		cityIndices = []
+		node = self
+		while node.parent is not None and node not in cachedStates:
+			cityIndices.append(node.cityIndex)
+			node = node.parent
+
+		state = cachedStates[node].copy() if node in cachedStates else rootState.copy()
+		for cityIndex in reversed(cityIndices):
+			state.visitCity(state.cities[cityIndex])
+		return state
+
+
+# Two cities whose order on the route can be fixed when the costs are symmetric, Time: O(n)
+# Every route has a mirror image (the same cities backwards from the start) with the same cost and the two cities
+# in the other order, so only routes that visit the first one before the second need to be searched.
+# The start city's two cheapest neighbours are picked, so mirror routes are cut right below the root.
+# Returns (first city index, second city index), or None if there are fewer than 3 cities
+def orientationCities(costMatrix:np.ndarray, startIndex:int):
+	if len(costMatrix) < 3:
+		return None
+	costs = costMatrix[startIndex].copy()
+	costs[startIndex] = math.inf
+	first, second = np.argsort(costs, kind='stable')[:2].tolist()
+	return first, second
+
+# Most (visited cities, last city) pairs a branch and bound search remembers the cheapest path to
+TRANSPOSITION_TABLE_SIZE = 2**20
+
+# Best-first branch and bound over StateNodes, deepest and then cheapest first, Space: O(qlen + n**3)
+# TSPSolver.branchAndBound runs one of these; the parallel workers subclass it to share the bssf between processes
+class BranchAndBoundSearch(object):
+	#rootState:ArrayState, reduced root State every node is materialized from
+	#bssfCost:int, cost of the best solution so far (states whose bound reaches it are pruned)
+	#bssfRoute:list[City], best route found by this search (None until one beats the bssf it was given)
+	#maxQueueSize:int, if given, states that would grow the queue past it are searched depth first in place instead
+	#boundFunction:object, lower bound used to prune and prioritize states (see TSPBounds), the reduced cost by default
+	#  (the depth first search always uses the reduced cost, since it never builds whole children)
+	#eliminatedEdges:int, edges removed from the root State because they can't be in a route that beats the bssf
+	#transpositions:TranspositionTable, cheapest queued path to each set of cities and last city (a dearer one is pruned)
+	#costMatrix:np.ndarray, original edge costs (from the cities' scenario unless given)
+	#orientation:tuple(int, int), if the costs are symmetric, cities that must be visited in this order (see orientationCities)
+	def __init__(self, rootState:ArrayState, bssfCost=math.inf, maxQueueSize:int=None, startTime:float=None, boundFunction=None,
+				 transpositionTableSize:int=TRANSPOSITION_TABLE_SIZE, costMatrix:np.ndarray=None, symmetric:bool=False):
+		self.rootState:ArrayState = rootState
+		self.costMatrix:np.ndarray = costMatrixForCities(rootState.cities) if costMatrix is None else costMatrix
+		self.orientation:tuple = None
+		if symmetric:
+			self.orientation = orientationCities(self.costMatrix, rootState.cities[0]._index)
+			self._cutMirrorEdges()
+		self.transpositions = TranspositionTable(transpositionTableSize)
+		self.boundFunction = ReducedCostBound() if boundFunction == None else boundFunction
+		self.bssfCost = bssfCost
+		self.bssfRoute:list[City] = None
+		self.maxQueueSize:int = maxQueueSize
+		self.startTime:float = time.time() if startTime == None else startTime
+		self.frontier = Frontier()
+		# Recently expanded nodes keep their materialized State, since their children usually come off the queue next
+		self.expandedStates = OrderedDict()
+		self.count:int = 0
+		self.maxQueueLen:int = 0
+		self.totalStatesCreated:int = 0
+		self.totalStatesPruned:int = 0
+		self.eliminatedEdges:int = 0
+		self._eliminateEdges()
+
+	# With the first orientation city before the second, the route can't go straight from the start to the second or
+	# come back to the start from the first, so those edges are removed from the root State (and it is re-reduced), Time: O(n)
+	def _cutMirrorEdges(self):
+		if self.orientation == None:
+			return
+		first, second = self.orientation
+		startIndex = self.rootState.cities[0]._index
+		self.rootState.matrix[startIndex, second] = math.inf
+		self.rootState.matrix[first, startIndex] = math.inf
+		self.rootState._reduceLines([startIndex, first], [second, startIndex])
+
+	# True if visiting cityIndex next would put the orientation cities out of order, Time: O(1)
+	def _breaksOrientation(self, visitedMask:int, cityIndex:int) -> bool:
+		return self.orientation != None and cityIndex == self.orientation[1] and not (visitedMask >> self.orientation[0]) & 1
+
+	# Removes every edge from the root State that can't be in a route cheaper than the bssf, Time: O(n**2)
+	# A route costs the root's bound plus the reduced costs of its edges (all >= 0), so an edge whose reduced cost is
+	# at least bssfCost - bound is never worth taking. Only edges with positive reduced costs go, so the root stays
+	# reduced and its bound doesn't change; States materialized from it afterwards start with fewer live edges.
+	def _eliminateEdges(self):
+		slack = self.bssfCost - self.rootState.costSoFar
+		if slack <= 0 or slack == math.inf:
+			return
+		matrix = self.rootState.matrix
+		eliminate = (matrix >= slack) & (matrix != math.inf)
+		numEliminated = int(np.count_nonzero(eliminate))
+		if numEliminated != 0:
+			matrix[eliminate] = math.inf
+			self.eliminatedEdges += numEliminated
+			# Cached States still hold the old edges, so drop them rather than mix the two
+			self.expandedStates.clear()
+
+	# Queues the node reached by visiting cityIndices (in order) after the start city, Time: O(d*n*k)
+	# (it is not counted as a created state, since it is usually the root or was created somewhere else)
+	def pushRoute(self, cityIndices:list=[]):
+		state = self.rootState.copy()
+		node = StateNode(None, state.cities[0]._index, state.costSoFar)
+		for cityIndex in cityIndices:
+			state.visitCity(state.cities[cityIndex])
+			node = StateNode(node, cityIndex, state.costSoFar, node.pathCost + int(self.costMatrix[node.cityIndex, cityIndex]))
+		node.costSoFar = self.boundFunction.evaluate(state)
+		self.transpositions.record(node.visitedMask, node.cityIndex, node.pathCost)
+		self.push(node)
+
+	# Time: O(log(qlen))
+	def push(self, node:StateNode):
+		self.frontier.push(node.numVisited, node.costSoFar, node)
+		if len(self.frontier) > self.maxQueueLen:
+			self.maxQueueLen = len(self.frontier)
+
+	# Nothing left on the queue can beat its smallest bound (if the queue is empty, the bssf is optimal), Time: O(qlen)
+	def lowerBound(self):
+		return min(self.frontier.minBound(), self.bssfCost)
+
+	# Continue searching and expanding states on the queue until the deadline or nothing is left, Time: O(qlen*n**3)
+	# Returns True if the whole tree was searched (so the bssf is optimal)
+	def run(self, deadline:float) -> bool:
+		while len(self.frontier) != 0 and time.time() < deadline:
+			self._refreshBssf()
+			node:StateNode = self.frontier.pop()
+			# If the bssf has changed between adding to the queue vs coming off, prune it
+			if node.shouldPrune(self.bssfCost):
+				self.totalStatesPruned += 1
+				continue
+			# A cheaper path to the same cities was queued after this one
+			if self.transpositions.isDominated(node.visitedMask, node.cityIndex, node.pathCost):
+				self.totalStatesPruned += 1
+				continue
+			state:ArrayState = node.materialize(self.rootState, self.expandedStates) # Time: O(d*n*k)
+
+			# If the queue is full, search everything below this state depth first instead of queueing its children
+			if self.maxQueueSize != None and len(self.frontier) >= self.maxQueueSize:
+				self._depthFirstSearch(state, deadline)
+				# If time ran out part way through, the state is still unexplored, so it goes back on the queue
+				if time.time() >= deadline:
+					self.frontier.push(node.numVisited, node.costSoFar, node)
+				continue
+
+			self._cacheState(node, state)
+			self._expand(node, state) # Time: O(n**2*k)
+		return len(self.frontier) == 0
+
+	# Expand and evaluate "children" aka a next possible unvisitedCity, Time: O(n**3)
+	# The bounds of all the children are found in one batch, and only the cheapest child's State is built (to cache it);
+	# the rest are queued as StateNodes or pruned without ever being built
+	def _expand(self, node:StateNode, state:ArrayState):
+		# The last city leads straight to a complete route, which is checked the usual way
+		if len(state.unvisitedCitiesSet) == 1:
+			self._expandLastCity(state)
+			return
+
+		childCities, bounds = state.childBounds() # Time: O(n**3)
+		self.totalStatesCreated += len(childCities)
+		# A stronger bound is only evaluated on the children the reduced cost bound didn't already prune
+		refineBounds = self.boundFunction.refinesReducedCost
+		if refineBounds and state.boundData == None:
+			self.boundFunction.evaluate(state) # So the children can start from this State's data
+		bestChildNode, bestCity, bestChildState = None, None, None
+		edgeCosts = self.costMatrix[node.cityIndex].tolist()
+		for nextCity, bound in zip(childCities, bounds.tolist()):
+			if bound == math.inf or bound >= self.bssfCost or self._breaksOrientation(node.visitedMask, nextCity._index):
+				self.totalStatesPruned += 1
+				continue
+			# Skip the child if a path at least as cheap already reached the same cities and city
+			pathCost = node.pathCost + int(edgeCosts[nextCity._index])
+			if not self.transpositions.record(node.visitedMask | (1 << nextCity._index), nextCity._index, pathCost):
+				self.totalStatesPruned += 1
+				continue
+			childState = None
+			if refineBounds:
+				childState = state.copy()
+				childState.visitCity(nextCity) # Time: O(n*k)
+				bound = self.boundFunction.evaluate(childState, state)
+				if bound == math.inf or bound >= self.bssfCost:
+					self.totalStatesPruned += 1
+					continue
+			childNode = StateNode(node, nextCity._index, int(bound), pathCost)
+			self.push(childNode)
+			if bestChildNode == None or childNode.costSoFar < bestChildNode.costSoFar:
+				bestChildNode, bestCity, bestChildState = childNode, nextCity, childState
+
+		# The cheapest child is the next to come off the queue, so keep its State instead of rebuilding it
+		if bestChildNode != None:
+			if bestChildState == None:
+				bestChildState = state.copy()
+				bestChildState.visitCity(bestCity) # Time: O(n*k)
+			self._cacheState(bestChildNode, bestChildState)
+
+	# Visits the only unvisited city, and returns to the start to see if it makes a solution, Time: O(n**2)
+	def _expandLastCity(self, state:ArrayState):
+		childState = state.copy() # Time: O(n**2)
+		self.totalStatesCreated += 1
+		childState.visitCity(next(iter(state.unvisitedCitiesSet))) # Time: O(n*k)
+
+		# The route is complete, so it either is a solution or it can't get back to the start
+		route, cost = childState.getSolution() # Time: O(1)
+		if route == None or cost == None:
+			self.totalStatesPruned += 1
+		else:
+			self._foundSolution(route, cost)
+
+	# Time: O(1)
+	def _cacheState(self, node:StateNode, state:ArrayState):
+		self.expandedStates[node] = state
+		if len(self.expandedStates) > len(self.rootState.cities):
+			self.expandedStates.popitem(last=False)
+
+	# Records a complete route, Time: O(n)
+	def _foundSolution(self, route:list, cost:int):
+		print(f"({'{: >5}'.format(round(time.time() - self.startTime, 2))}s)  BranchAndBound:{'->'.join(city._name for city in route)}, Cost: {cost}")
+		self.count += 1
+		if cost < self.bssfCost:
+			self.bssfCost = cost
+			self.bssfRoute = list(route)
+			self._eliminateEdges()
+
+	# Hook to pick up a bssf found somewhere else before each expansion (nothing else to check here), Time: O(1)
+	def _refreshBssf(self):
+		pass
+
+	# Searches every route below state depth first, visiting and undoing cities on the one State (no copies), Space: O(n**2)
+	# Children are tried cheapest reduced edge first
+	def _depthFirstSearch(self, state:ArrayState, deadline:float):
+		startIndex = state.cities[0]._index
+		undoLog = []
+		stack = [iter(self._orderedChildren(state))]
+
+		while len(stack) != 0 and time.time() < deadline:
+			nextCity = next(stack[-1], None)
+			# All children at this depth are done, so go back up a level
+			if nextCity == None:
+				stack.pop()
+				if len(undoLog) != 0:
+					state.undoVisit(undoLog)
+				continue
+
+			self.totalStatesCreated += 1
+			state.visitCity(nextCity, undoLog) # Time: O(n*k)
+
+			# Complete route: the cost of returning to the start is the last reduced cost left in the matrix
+			if len(state.unvisitedCitiesSet) == 0:
+				cost = state.costSoFar + state.matrix[nextCity._index, startIndex]
+				if cost < self.bssfCost:
+					self._foundSolution(state.routeSoFar, int(cost))
+				state.undoVisit(undoLog)
+			elif state.shouldPrune(self.bssfCost):
+				self.totalStatesPruned += 1
+				state.undoVisit(undoLog)
+			else:
+				stack.append(iter(self._orderedChildren(state)))
+
+		# If time ran out, put the State back the way it was given
+		while len(undoLog) != 0:
+			state.undoVisit(undoLog)
+
+	# Unvisited cities reachable from the end of the route (that keep the orientation), cheapest reduced edge first, Time: O(n*log(n))
+	def _orderedChildren(self, state:ArrayState):
+		lastRow = state.matrix[state.routeSoFar[-1]._index]
+		children = [city for city in state.unvisitedCitiesSet if lastRow[city._index] != math.inf]
+		if self.orientation != None and state.cities[self.orientation[0]] in state.unvisitedCitiesSet:
+			children = [city for city in children if city._index != self.orientation[1]]
+		children.sort(key=lambda city: lastRow[city._index])
+		return children
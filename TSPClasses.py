@@ -5,34 +5,67 @@ import random
 import time
 
 class TSPSolution:
-	def __init__(self, listOfCities):
-		self.route = listOfCities
-		self.cost = self._costOfRoute()
+	__slots__ = ('indices', '_route', '_cities', '_costMatrix', '_cost')
+	#indices:np.ndarray(int32), city indices in route order
+	#_route:list[City], the route's cities, if it was given as a list (otherwise built from _cities when asked for)
+	#_cities:list[City], cities to find the cost matrix from (for solutions built from indices, every city of the scenario in index order)
+	#_costMatrix:np.ndarray, the scenario's cost matrix (shared), found on first use
+	#_cost:int, cost of the route, found on first use
+	def __init__(self, listOfCities=None, indices=None, cities:list=None, costMatrix:np.ndarray=None):
+		if listOfCities is not None:
+			self._route = listOfCities
+			self._cities = listOfCities
+			self.indices = np.array([city._index for city in listOfCities], dtype=np.int32)
+		else:
+			self._route = None
+			self._cities = cities
+			self.indices = np.asarray(indices, dtype=np.int32)
+		self._costMatrix = costMatrix
+		self._cost = None
 		#print( [c._index for c in listOfCities] )
 
+	# Route from city indices without building a list of City objects, Space: O(n) int32s
+	@classmethod
+	def fromIndices(cls, indices, cities:list, costMatrix:np.ndarray=None):
+		return cls(indices=indices, cities=cities, costMatrix=costMatrix)
+
+	# The route's City objects (built from the indices the first time they are needed, e.g. by the GUI), Time: O(n)
+	@property
+	def route(self) -> list:
+		if self._route is None:
+			self._route = [self._cities[index] for index in self.indices.tolist()]
+		return self._route
+
+	# Time: O(n) the first time, then O(1)
+	@property
+	def cost(self):
+		if self._cost is None:
+			self._cost = self._costOfRoute()
+		return self._cost
+
+	# Time: O(1) (O(n**2) the first time for test cities, which keep their costs in a 2D list)
+	def _getCostMatrix(self) -> np.ndarray:
+		if self._costMatrix is None:
+			self._costMatrix = costMatrixForCities(self._cities)
+		return self._costMatrix
+
+	# Cost of every edge on the route, the last one returning to the start, Time: O(n)
+	# Without a cost matrix given, the edges are costed on their own so large scenarios never build one
+	def _edgeCosts(self) -> np.ndarray:
+		if self._costMatrix is None and not self._cities[0].testFlag:
+			return self._cities[0]._scenario.costsBetween(self.indices, np.roll(self.indices, -1))
+		return self._getCostMatrix()[self.indices, np.roll(self.indices, -1)]
+
+	# Sums the route's edges with one gather over the cost matrix, Time: O(n)
 	def _costOfRoute(self):
-		cost = 0
-		last = self.route[0]
-		for city in self.route[1:]:
-			cost += last.costTo(city)
-			last = city
-		cost += self.route[-1].costTo(self.route[0])
-		return cost
+		return asCost(self._edgeCosts().sum())
 
 	def enumerateEdges(self):
-		elist = []
-		c1 = self.route[0]
-		for c2 in self.route[1:]:
-			dist = c1.costTo(c2)
-			if dist == np.inf:
-				return None
-			elist.append( (c1, c2, int(math.ceil(dist))) )
-			c1 = c2
-		dist = self.route[-1].costTo(self.route[0])
-		if dist == np.inf:
+		edgeCosts = self._edgeCosts()
+		if not np.isfinite(edgeCosts).all():
 			return None
-		elist.append( (self.route[-1], self.route[0], int(math.ceil(dist))) )
-		return elist
+		route = self.route
+		return [(route[i], route[(i + 1) % len(route)], int(cost)) for i, cost in enumerate(edgeCosts.tolist())]
 
 	def __str__(self):
 		string = "TSPSolution{"
@@ -54,6 +87,20 @@ def nameForInt( num ):
 	else:
 		return nameForInt((num-1) // 26 ) + nameForInt((num-1) % 26 +1)
 
+# Returns the cost matrix the cities belong to (test cities carry their own 2D list of costs), Time: O(1)
+def costMatrixForCities(cities):
+	if cities[0].testFlag:
+		return np.array(cities[0]._scenario, dtype=float)
+	return cities[0]._scenario.getCostMatrix()
+
+# Cost of a route given as city indices, or of every row of a 2D array of routes at once (inf where a route uses a
+# missing edge), with one gather over the cost matrix, Time: O(n) per route
+def routeCosts(costMatrix:np.ndarray, routes:np.ndarray):
+	return costMatrix[routes, np.roll(routes, -1, axis=-1)].sum(axis=-1)
+
+# Route costs are whole numbers (or math.inf), Time: O(1)
+def asCost(cost):
+	return int(cost) if cost != math.inf else math.inf
 
 
 class Scenario:
@@ -83,17 +130,87 @@ class Scenario:
 			city.setIndexAndName(num, nameForInt(num + 1))
 			num += 1
 
-		# Assume all edges exists except self-edges
-		ncities = len(self._cities)
-		self._edge_exists = ( np.ones((ncities, ncities)) - np.diag(np.ones((ncities))) ) > 0
+		# Assume all edges exists except self-edges, which needs no matrix until Hard mode removes some of them
+		self._edge_matrix = None
 		if difficulty == "Hard":
 			self.thinEdges()
 		elif difficulty == "Hard (Deterministic)":
 			self.thinEdges(deterministic=True)
 
+		# Built on first use, after the edges have been thinned
+		self._cost_matrix = None
+		self._is_symmetric = None
+		self._coordinates = None
+
 	def getCities(self):
 		return self._cities
 
+	# Returns the n x n matrix of costs between every pair of cities, Time: O(n**2) once, then O(1)
+	# Entries hold the same integer costs as City.costTo (stored as floats so missing edges can be np.inf)
+	def getCostMatrix(self):
+		if self._cost_matrix is None:
+			self._cost_matrix = self._computeCostMatrix()
+		return self._cost_matrix
+
+	# True if every edge costs the same both ways (Easy scenarios), so a route and its reverse cost the same, Time: O(n**2) once
+	def isSymmetric(self):
+		if self._is_symmetric is None:
+			costMatrix = self.getCostMatrix()
+			self._is_symmetric = bool(np.array_equal(costMatrix, costMatrix.T))
+		return self._is_symmetric
+
+	# n x n matrix of which edges exist, Space: O(n**2)
+	# Only Hard scenarios keep one from the start (thinEdges), for the others it is built the first time it is asked for
+	@property
+	def _edge_exists(self):
+		if self._edge_matrix is None:
+			self._edge_matrix = ~np.eye(len(self._cities), dtype=bool)
+		return self._edge_matrix
+
+	# Whether the edge from each of sources to the matching destination exists (arrays of city indices, broadcast
+	# together), Time: O(size of the result), without building the n x n matrix if there isn't one
+	def _edgesExist(self, sources, destinations):
+		if self._edge_matrix is None:
+			return np.not_equal(sources, destinations)
+		return self._edge_matrix[sources, destinations]
+
+	# Computes every City.costTo at once with broadcasting, Time: O(n**2)
+	def _computeCostMatrix(self):
+		indices = np.arange(len(self._cities))
+		return self.costsBetween(indices[:, np.newaxis], indices[np.newaxis, :])
+
+	# Costs of the edges among the given cities, the same as getCostMatrix()[np.ix_(indices, indices)] without
+	# building the full matrix, Time: O(k**2) for k cities
+	def costSubmatrix(self, indices):
+		indices = np.asarray(indices)
+		return self.costsBetween(indices[:, np.newaxis], indices[np.newaxis, :])
+
+	# City.costTo from each of sources to the matching destination (arrays of city indices, broadcast together, so
+	# a column against a row gives a matrix), Time: O(size of the result)
+	def costsBetween(self, sources, destinations):
+		xs, ys, elevations = self.cityCoordinates()
+
+		# Euclidean Distance, row = source city, column = destination city
+		cost = np.sqrt((xs[destinations] - xs[sources])**2 +
+					   (ys[destinations] - ys[sources])**2)
+
+		# For Medium and Hard modes, add in an asymmetric cost (in easy mode it is zero).
+		if not self._difficulty == 'Easy':
+			cost = cost + (elevations[destinations] - elevations[sources])
+			cost = np.maximum(cost, 0.0)
+
+		cost = np.ceil(cost * City.MAP_SCALE)
+		# Removed edges (and self-edges) are infinite
+		return np.where(self._edgesExist(sources, destinations), cost, np.inf)
+
+	# Arrays of every city's x, y and elevation (shared, so not to be changed), Time: O(n) once, then O(1)
+	def cityCoordinates(self):
+		if self._coordinates is None:
+			self._coordinates = (np.array([city._x for city in self._cities], dtype=float),
+								 np.array([city._y for city in self._cities], dtype=float),
+								 np.array([city._elevation for city in self._cities], dtype=float))
+		return self._coordinates
+
 
 	def randperm(self, n):				#isn't there a numpy function that does this and even gets called in Solver?
 		perm = np.arange(n)
@@ -109,6 +226,7 @@ class Scenario:
 		edge_count = ncities*(ncities - 1) # can't have self-edge
 		num_to_remove = np.floor(self.HARD_MODE_FRACTION_TO_REMOVE * edge_count)
 
+		self._edge_matrix = ~np.eye(ncities, dtype=bool)
 		can_delete	= self._edge_exists.copy()
 
 		# Set aside a route to ensure at least one tour exists
@@ -158,26 +276,10 @@ class City:
 	MAP_SCALE = 1000.0
 	def costTo(self, other_city):
 
-		assert(type(other_city) == City)
-
 		if self.testFlag:
 			return self._scenario[self._index][other_city._index]
 
-		# In hard mode, remove edges; this slows down the calculation...
-		# Use this in all difficulties, it ensures INF for self-edge
-		if not self._scenario._edge_exists[self._index, other_city._index]:
-			return np.inf
-
-		# Euclidean Distance
-		cost = math.sqrt((other_city._x - self._x)**2 +
-						  (other_city._y - self._y)**2 )
-
-		# For Medium and Hard modes, add in an asymmetric cost (in easy mode it is zero).
-		if not self._scenario._difficulty == 'Easy':
-			cost += (other_city._elevation - self._elevation)
-			if cost < 0.0:
-				cost = 0.0					# Shouldn't it cost something to go downhill, no matter how steep??????
-
-
-		return int(math.ceil(cost * self.MAP_SCALE))
+		# Read from the scenario's precomputed matrix (INF for removed edges and self-edges)
+		cost = self._scenario.getCostMatrix()[self._index, other_city._index]
+		return np.inf if cost == np.inf else int(cost)
 
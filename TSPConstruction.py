@@ -0,0 +1,183 @@
+import math
+import time
+import numpy as np
+from TSPClasses import asCost, routeCosts
+
+# Most cells of the (starts x n) arrays built at once, to bound memory and how long one batch runs past the deadline
+NEAREST_NEIGHBOR_BATCH_CELLS = 2**18
+
+# Nearest neighbor tours from many start cities at once, returns (best route as city indices or None, its cost,
+# number of starts tried), Time: O(s*n**2) for s starts
+# Every start city takes one step per NumPy call: each row of the batch masks its visited cities and takes the argmin
+# of its current city's costs. If a row has no finite edge left it moves to any unvisited city, so its tour is
+# infinite and only counts if no start finds a valid one.
+# Starts are tried in the order given (every city by default) in batches, until they run out or the deadline passes.
+# The first batch is just the first start, so there is a route to return, and it is timed so that later batches are
+# no bigger than what the time left allows (a batch costs at most as much per start as a single start).
+# onImprovement(cost), if given, is called with the best cost so far after every batch that lowers it.
+def nearestNeighborTours(costMatrix:np.ndarray, starts:list=None, deadline:float=math.inf,
+						 batchCells:int=NEAREST_NEIGHBOR_BATCH_CELLS, onImprovement=None):
+	ncities = len(costMatrix)
+	starts = np.arange(ncities) if starts is None else np.asarray(starts, dtype=int)
+	maxBatchSize = max(1, batchCells // max(ncities, 1))
+	bestRoute, bestCost, numTried = None, math.inf, 0
+	startTime = time.time()
+
+	while numTried < len(starts):
+		if numTried == 0:
+			batchSize = 1
+		else:
+			timeLeft = deadline - time.time()
+			if timeLeft <= 0:
+				break
+			timePerStart = (time.time() - startTime) / numTried
+			batchSize = int(max(1, min(maxBatchSize, timeLeft / timePerStart))) if timePerStart > 0 else maxBatchSize
+		batch = starts[numTried:numTried + batchSize]
+		rows = np.arange(len(batch))
+		routes = np.empty((len(batch), ncities), dtype=int)
+		routes[:, 0] = batch
+		visited = np.zeros((len(batch), ncities), dtype=bool)
+		visited[rows, batch] = True
+		costs = np.zeros(len(batch))
+
+		# One step for every start in the batch, Time: O(s*n)
+		for step in range(1, ncities):
+			edgeCosts = np.where(visited, math.inf, costMatrix[routes[:, step - 1]])
+			nextCities = edgeCosts.argmin(axis=1)
+			# Rows with every edge infinite landed on a visited city, so take any unvisited one
+			stuck = visited[rows, nextCities]
+			if stuck.any():
+				nextCities[stuck] = visited[stuck].argmin(axis=1)
+			costs += costMatrix[routes[:, step - 1], nextCities]
+			routes[:, step] = nextCities
+			visited[rows, nextCities] = True
+		costs += costMatrix[routes[:, -1], routes[:, 0]]
+		numTried += len(batch)
+
+		best = int(costs.argmin())
+		if bestRoute is None or costs[best] < bestCost:
+			bestRoute, bestCost = routes[best].tolist(), costs[best]
+			if onImprovement != None:
+				onImprovement(bestCost)
+
+	if bestRoute is None:
+		return None, math.inf, numTried
+	return bestRoute, asCost(bestCost), numTried
+
+
+# Most cells of the (tours x n) arrays sampled at once by randomTours
+RANDOM_TOUR_BATCH_CELLS = 2**18
+
+# Samples random tours in batches until one is valid, returns (cheapest valid route in that batch as city indices or
+# None, its cost, number of tours evaluated), Time: O(b*n*log(n)) per batch of b tours
+# Each batch is a 2D array of permutations (argsort of random keys) scored with one gather from the cost matrix.
+# Uses NumPy's global random state, so np.random.seed makes it repeatable.
+def randomTours(costMatrix:np.ndarray, deadline:float=math.inf, batchCells:int=RANDOM_TOUR_BATCH_CELLS):
+	ncities = len(costMatrix)
+	batchSize = max(1, batchCells // max(ncities, 1))
+	numTried = 0
+	while numTried == 0 or time.time() < deadline:
+		routes = np.argsort(np.random.random((batchSize, ncities)), axis=1)
+		costs = routeCosts(costMatrix, routes)
+		numTried += batchSize
+		best = int(costs.argmin())
+		if costs[best] != math.inf:
+			return routes[best].tolist(), int(costs[best]), numTried
+	return None, math.inf, numTried
+
+
+# Cheapest insertion, returns (route as city indices, its cost), Time: O(n**2) plus rescans (see _insertionTour)
+# Starts from the cheapest two city loop and each step inserts the city that adds the least to the tour, where it
+# adds the least
+def cheapestInsertionTour(costMatrix:np.ndarray):
+	return _insertionTour(costMatrix, farthest=False)
+
+
+# Farthest insertion, returns (route as city indices, its cost), Time: O(n**2) plus rescans (see _insertionTour)
+# Starts from the most expensive two city loop and each step inserts the city farthest from the tour (that can be
+# inserted with real edges), where it adds the least
+def farthestInsertionTour(costMatrix:np.ndarray):
+	return _insertionTour(costMatrix, farthest=True)
+
+
+# Builds a tour by insertion, keeping the tour as a successor array and, for every city not in it yet, the cheapest
+# place to insert it (bestAfter, the tour city it goes after) and what that adds (bestCost)
+# After each insertion only the two new edges are checked against every city's best, Time: O(n); cities whose best
+# was the edge just replaced are rescanned over the tour, Time: O(n) each, so there is never a full rescan.
+# Missing edges make an insertion cost inf, so they are only used when a city has no other place to go.
+def _insertionTour(costMatrix:np.ndarray, farthest:bool):
+	ncities = len(costMatrix)
+	if ncities < 3:
+		route = list(range(ncities))
+		return route, asCost(routeCosts(costMatrix, route))
+
+	# Two city loop to start from, with real edges both ways if there is one
+	loopCosts = costMatrix + costMatrix.T
+	np.fill_diagonal(loopCosts, math.inf)
+	if farthest and np.isfinite(loopCosts).any():
+		first, second = np.unravel_index(np.where(np.isfinite(loopCosts), loopCosts, -1).argmax(), loopCosts.shape)
+	else:
+		first, second = np.unravel_index(loopCosts.argmin(), loopCosts.shape)
+	nextCity = np.full(ncities, -1)
+	nextCity[first], nextCity[second] = second, first
+	inTour = np.zeros(ncities, dtype=bool)
+	inTour[[first, second]] = True
+
+	allCities = np.arange(ncities)
+	bestCost, bestAfter = _bestInsertions(costMatrix, nextCity, np.array([first, second]), allCities)
+	distance = np.minimum(costMatrix[[first, second]].min(axis=0), costMatrix[:, [first, second]].min(axis=1))
+
+	with np.errstate(invalid='ignore'):
+		for _ in range(ncities - 2):
+			remaining = allCities[~inTour]
+			if farthest:
+				feasible = remaining[np.isfinite(bestCost[remaining])]
+				choices = feasible if len(feasible) else remaining
+				city = choices[distance[choices].argmax()]
+			else:
+				city = remaining[bestCost[remaining].argmin()]
+
+			# Insert city between after and before
+			after = bestAfter[city]
+			before = nextCity[after]
+			nextCity[after], nextCity[city] = city, before
+			inTour[city] = True
+			remaining = allCities[~inTour]
+			if len(remaining) == 0:
+				break
+
+			# Rescan the cities whose best place was the edge just replaced
+			stale = remaining[bestAfter[remaining] == after]
+			if len(stale):
+				bestCost[stale], bestAfter[stale] = _bestInsertions(costMatrix, nextCity, allCities[inTour], stale)
+			# Check the two new edges for everyone else
+			for edgeStart, edgeEnd in ((after, city), (city, before)):
+				added = _insertionCosts(costMatrix, edgeStart, edgeEnd, remaining)
+				better = added < bestCost[remaining]
+				bestCost[remaining[better]], bestAfter[remaining[better]] = added[better], edgeStart
+			distance = np.minimum(distance, np.minimum(costMatrix[city], costMatrix[:, city]))
+
+	route = [first]
+	for _ in range(ncities - 1):
+		route.append(nextCity[route[-1]])
+	route = [int(city) for city in route]
+	return route, asCost(routeCosts(costMatrix, route))
+
+
+# What inserting each of cities between edgeStart and edgeEnd adds to the tour (inf if that would use a missing edge,
+# or -inf if it replaces one with real edges), Time: O(len(cities))
+def _insertionCosts(costMatrix:np.ndarray, edgeStart, edgeEnd, cities:np.ndarray) -> np.ndarray:
+	added = costMatrix[edgeStart, cities] + costMatrix[cities, edgeEnd] - costMatrix[edgeStart, edgeEnd]
+	return np.where(np.isnan(added), math.inf, added)
+
+
+# Cheapest place to insert each of cities into the tour made of tourCities, returns (what it adds, the tour city it
+# goes after), Time: O(len(cities)*len(tourCities))
+def _bestInsertions(costMatrix:np.ndarray, nextCity:np.ndarray, tourCities:np.ndarray, cities:np.ndarray):
+	nexts = nextCity[tourCities]
+	with np.errstate(invalid='ignore'):
+		added = (costMatrix[np.ix_(cities, nexts)] + costMatrix[np.ix_(tourCities, cities)].T
+				 - costMatrix[tourCities, nexts])
+	added = np.where(np.isnan(added), math.inf, added)
+	best = added.argmin(axis=1)
+	return added[np.arange(len(cities)), best], tourCities[best]
@@ -0,0 +1,147 @@
+import math
+import multiprocessing
+import time
+import numpy as np
+from TSPClasses import Scenario
+from TSPConstruction import cheapestInsertionTour
+from TSPLocalSearch import linKernighan
+
+# Most cities in one cluster, so each cluster's cost matrix stays small (clusters end up with half to all of this)
+CLUSTER_SIZE = 500
+# Cities on each side of a join between two clusters that are re-optimized once the subtours are stitched
+REPAIR_WINDOW = 25
+# Fraction of the time allowance spent solving the clusters (the rest goes to repairing the joins)
+CLUSTER_TIME_FRACTION = 0.8
+# Largest scenario whose full n x n cost matrix is built (e.g. for the lower bound shown with the results)
+DENSE_MAX_CITIES = 5000
+
+# Tour of a large scenario by spatial decomposition, Space: O(n*CLUSTER_SIZE), never the n x n cost matrix
+# The cities are split into clusters of at most CLUSTER_SIZE by their coordinates (see spatialClusters), which are
+# visited in the order of a tour of their centers. Each cluster is solved on its own cost matrix as a path whose ends
+# are pulled toward the clusters before and after it (see _solveCluster), on numWorkers processes, and the paths are
+# joined in order. Every join is then repaired by re-optimizing the REPAIR_WINDOW cities on each side of it.
+# Returns (route as city indices, number of clusters)
+def decomposedTour(scenario:Scenario, deadline:float, numWorkers:int=1, startTime:float=None):
+	startTime = time.time() if startTime == None else startTime
+	xs, ys, _ = scenario.cityCoordinates()
+	clusterDeadline = startTime + (deadline - startTime) * CLUSTER_TIME_FRACTION
+	clusters = spatialClusters(xs, ys)
+	clusters = [clusters[index] for index in _clusterOrder(xs, ys, clusters, clusterDeadline)]
+
+	# Solve every cluster, Time: O(CLUSTER_SIZE**2) each
+	# Each process builds the cost matrices of the clusters it is solving, so only one per process exists at a time
+	if numWorkers <= 1 or len(clusters) == 1:
+		paths = [_solveCluster(*_clusterTask(scenario, clusters, index, clusterDeadline)) for index in range(len(clusters))]
+	else:
+		with multiprocessing.get_context().Pool(numWorkers, initializer=_startClusterWorker,
+												initargs=(scenario, clusters, clusterDeadline)) as pool:
+			paths = pool.map(_solveClusterAt, range(len(clusters)))
+	route = np.concatenate([cluster[path] for cluster, path in zip(clusters, paths)])
+
+	# Where each cluster starts (the first one's start is the join from the last cluster back to it)
+	joins = np.cumsum([0] + [len(cluster) for cluster in clusters[:-1]]) if len(clusters) > 1 else []
+	for join in joins:
+		if time.time() >= deadline:
+			break
+		_repairJoin(scenario, route, int(join), deadline)
+	return route.tolist(), len(clusters)
+
+
+# Splits the cities into clusters of at most CLUSTER_SIZE by recursive bisection at the median of whichever
+# coordinate is more spread out, so the clusters are compact and about the same size, Time: O(n*log(n))
+# Returns a list of arrays of city indices
+def spatialClusters(xs:np.ndarray, ys:np.ndarray, clusterSize:int=CLUSTER_SIZE) -> list:
+	clusters = []
+	pending = [np.arange(len(xs))]
+	while len(pending) != 0:
+		cities = pending.pop()
+		if len(cities) <= clusterSize:
+			clusters.append(cities)
+			continue
+		coordinates = xs[cities] if np.ptp(xs[cities]) >= np.ptp(ys[cities]) else ys[cities]
+		half = len(cities) // 2
+		split = np.argpartition(coordinates, half)
+		pending.append(cities[split[:half]])
+		pending.append(cities[split[half:]])
+	return clusters
+
+
+# Order to visit the clusters in: a tour of their centers, Time: O(m**2) for m clusters
+def _clusterOrder(xs:np.ndarray, ys:np.ndarray, clusters:list, deadline:float) -> list:
+	centers = np.array([(xs[cluster].mean(), ys[cluster].mean()) for cluster in clusters])
+	centerCosts = np.sqrt(((centers[:, np.newaxis, :] - centers[np.newaxis, :, :])**2).sum(axis=2))
+	np.fill_diagonal(centerCosts, math.inf)
+	order, _ = cheapestInsertionTour(centerCosts)
+	order, _, _, _ = linKernighan(centerCosts, order, deadline, symmetric=True)
+	return order
+
+
+# What a cluster solving process works on: (scenario, clusters in visiting order, deadline)
+_clusterWork = None
+
+# Initializer of a cluster solving process, Time: O(1)
+def _startClusterWorker(scenario:Scenario, clusters:list, deadline:float):
+	global _clusterWork
+	_clusterWork = (scenario, clusters, deadline)
+
+
+# Entry point of a cluster solving process for the cluster at index, Time: O(CLUSTER_SIZE**2)
+def _solveClusterAt(index:int) -> np.ndarray:
+	scenario, clusters, deadline = _clusterWork
+	return _solveCluster(*_clusterTask(scenario, clusters, index, deadline))
+
+
+# Arguments of _solveCluster for the cluster at index: its cost matrix, the cheapest way into each of its cities
+# from the cluster before it, and out of each to the cluster after it, Time: O(CLUSTER_SIZE**2)
+def _clusterTask(scenario:Scenario, clusters:list, index:int, deadline:float):
+	cluster = clusters[index]
+	if len(clusters) == 1:
+		return scenario.costSubmatrix(cluster), None, None, deadline
+	previous, following = clusters[index - 1], clusters[(index + 1) % len(clusters)]
+	entryCosts = scenario.costsBetween(previous[:, np.newaxis], cluster[np.newaxis, :]).min(axis=0)
+	exitCosts = scenario.costsBetween(cluster[:, np.newaxis], following[np.newaxis, :]).min(axis=1)
+	return scenario.costSubmatrix(cluster), entryCosts, exitCosts, deadline
+
+
+# Solves one cluster on its own cost matrix, returns its path as positions in the cluster, Time: O(k**2) for k cities
+# The cluster is first solved as a tour (cheapest insertion, then Lin-Kernighan). If it has neighbours, an extra
+# city standing for them (reached at exitCosts, left at entryCosts) is inserted where it costs least and the tour
+# improved again, so cutting the tour there leaves a path that starts and ends near the neighbouring clusters.
+def _solveCluster(costMatrix:np.ndarray, entryCosts:np.ndarray, exitCosts:np.ndarray, deadline:float) -> np.ndarray:
+	route, _ = cheapestInsertionTour(costMatrix)
+	route, _, _, _ = linKernighan(costMatrix, route, deadline, symmetric=np.array_equal(costMatrix, costMatrix.T))
+	if entryCosts is None:
+		return np.array(route, dtype=int)
+
+	ncities = len(costMatrix)
+	extended = np.full((ncities + 1, ncities + 1), math.inf)
+	extended[:-1, :-1] = costMatrix
+	extended[-1, :-1], extended[:-1, -1] = entryCosts, exitCosts
+	nextCities = np.roll(route, -1)
+	with np.errstate(invalid='ignore'):
+		cut = int(np.nan_to_num(exitCosts[route] + entryCosts[nextCities] - costMatrix[route, nextCities],
+								nan=math.inf).argmin())
+	route = np.roll(route, -(cut + 1)).tolist() + [ncities]
+	route, _, _, _ = linKernighan(extended, route, deadline)
+	return np.roll(route, -route.index(ncities))[1:]
+
+
+# Re-optimizes the REPAIR_WINDOW cities before and after position join of route, in place, Time: O(REPAIR_WINDOW**2)
+# The cities just outside the window stay put: the path between them becomes a tour through one extra city that
+# costs what leaving the first of them and reaching the second does, which Lin-Kernighan can then improve
+def _repairJoin(scenario:Scenario, route:np.ndarray, join:int, deadline:float):
+	ncities = len(route)
+	if ncities < 2 * REPAIR_WINDOW + 2:
+		return
+	positions = np.arange(join - REPAIR_WINDOW, join + REPAIR_WINDOW) % ncities
+	window = route[positions]
+	before, after = route[(join - REPAIR_WINDOW - 1) % ncities], route[(join + REPAIR_WINDOW) % ncities]
+
+	# The extra city is the last row and column
+	costMatrix = np.full((len(window) + 1, len(window) + 1), math.inf)
+	costMatrix[:-1, :-1] = scenario.costSubmatrix(window)
+	costMatrix[-1, :-1] = scenario.costsBetween(before, window)
+	costMatrix[:-1, -1] = scenario.costsBetween(window, after)
+	path, _, _, _ = linKernighan(costMatrix, [len(window)] + list(range(len(window))), deadline)
+	path = np.roll(path, -path.index(len(window)))[1:]
+	route[positions] = window[path]
@@ -0,0 +1,109 @@
+import math
+import multiprocessing
+import time
+import numpy as np
+from TSPClasses import asCost, routeCosts
+
+# Individuals in a population, how many of the best are copied unchanged into the next generation, and how many
+# individuals each parent is picked from (tournament selection)
+POPULATION_SIZE = 100
+ELITE_SIZE = 4
+TOURNAMENT_SIZE = 3
+# Chance that a child has part of its route reversed
+MUTATION_RATE = 0.3
+
+# Genetic algorithm over a population kept as a (P x n) array of routes, Time: O(P*n) per generation
+# Every generation is a handful of array operations: fitness is one gather over the cost matrix (missing edges make
+# a route infinite, so infeasible routes never win), parents are picked by tournament, children are made by order
+# crossover and inversion mutation in one batch, and the ELITE_SIZE best routes carry over unchanged.
+# seedRoutes (e.g. the greedy tour) start in the population, the rest of which is random.
+# onImprovement(cost), if given, is called with the best cost each time it improves.
+# Returns (best route as city indices, its cost, number of generations, [(seconds, best cost) each time it improved])
+def geneticAlgorithm(costMatrix:np.ndarray, deadline:float, seedRoutes:list=[], populationSize:int=POPULATION_SIZE,
+					 seed:int=None, startTime:float=None, onImprovement=None):
+	rng = np.random.default_rng(seed)
+	startTime = time.time() if startTime == None else startTime
+	ncities = len(costMatrix)
+	population = rng.random((populationSize, ncities)).argsort(axis=1)
+	for i, route in enumerate(seedRoutes[:populationSize]):
+		population[i] = route
+	costs = routeCosts(costMatrix, population)
+	best = int(costs.argmin())
+	bestRoute, bestCost = population[best].copy(), costs[best]
+	history = [(time.time() - startTime, asCost(bestCost))]
+	generations = 0
+
+	while time.time() < deadline and ncities > 3:
+		order = costs.argsort(kind='stable')
+		elites = population[order[:ELITE_SIZE]]
+		numChildren = populationSize - len(elites)
+		firstParents = population[_tournament(costs, numChildren, rng)]
+		secondParents = population[_tournament(costs, numChildren, rng)]
+		children = orderCrossover(firstParents, secondParents, rng)
+		_invertSegments(children, rng.random(numChildren) < MUTATION_RATE, rng)
+
+		population = np.concatenate((elites, children))
+		costs = routeCosts(costMatrix, population)
+		generations += 1
+		best = int(costs.argmin())
+		if costs[best] < bestCost:
+			bestRoute, bestCost = population[best].copy(), costs[best]
+			history.append((time.time() - startTime, asCost(bestCost)))
+			if onImprovement != None:
+				onImprovement(bestCost)
+
+	return bestRoute.tolist(), asCost(bestCost), generations, history
+
+
+# Order crossover (OX) of every pair of rows at once, Time: O(P*n)
+# Each child keeps a random slice of its first parent in place, and the rest of its cities in the order they come
+# in the second parent, starting after the slice
+def orderCrossover(firstParents:np.ndarray, secondParents:np.ndarray, rng) -> np.ndarray:
+	numPairs, ncities = firstParents.shape
+	rows = np.arange(numPairs)[:, np.newaxis]
+	cuts = np.sort(rng.integers(0, ncities, size=(numPairs, 2)), axis=1)
+	positions = np.arange(ncities)[np.newaxis, :]
+	inSlice = (positions >= cuts[:, :1]) & (positions <= cuts[:, 1:])
+
+	children = np.empty_like(firstParents)
+	children[inSlice] = firstParents[inSlice]
+	# Positions and second parent's cities both from just after the slice, wrapping around
+	fillOrder = (positions + cuts[:, 1:] + 1) % ncities
+	fillPositions = ~np.take_along_axis(inSlice, fillOrder, axis=1)
+	secondInOrder = np.take_along_axis(secondParents, fillOrder, axis=1)
+	citiesInSlice = np.zeros((numPairs, ncities), dtype=bool)
+	citiesInSlice[rows, firstParents] = inSlice
+	citiesLeft = ~np.take_along_axis(citiesInSlice, secondInOrder, axis=1)
+	# Every row has as many positions to fill as cities left, so the flattened masks line up row by row
+	children[np.broadcast_to(rows, fillOrder.shape)[fillPositions], fillOrder[fillPositions]] = secondInOrder[citiesLeft]
+	return children
+
+
+# Indices of count individuals, each the cheapest of TOURNAMENT_SIZE picked at random, Time: O(count)
+def _tournament(costs:np.ndarray, count:int, rng) -> np.ndarray:
+	entrants = rng.integers(0, len(costs), size=(count, TOURNAMENT_SIZE))
+	return entrants[np.arange(count), costs[entrants].argmin(axis=1)]
+
+
+# Reverses a random part of the route in each selected row, in place, Time: O(P*n)
+def _invertSegments(routes:np.ndarray, selected:np.ndarray, rng):
+	numRoutes, ncities = routes.shape
+	cuts = np.sort(rng.integers(0, ncities, size=(numRoutes, 2)), axis=1)
+	cuts[~selected] = 0
+	positions = np.arange(ncities)[np.newaxis, :]
+	inSegment = (positions >= cuts[:, :1]) & (positions <= cuts[:, 1:])
+	source = np.where(inSegment, cuts[:, :1] + cuts[:, 1:] - positions, positions)
+	routes[:] = np.take_along_axis(routes, source, axis=1)
+
+
+# Runs one independent population per process (islands) and returns the best, Time: O(P*n) per generation per island
+# Returns the same as geneticAlgorithm, with generations summed and the history of the island that won
+def parallelGeneticAlgorithm(costMatrix:np.ndarray, deadline:float, numWorkers:int, seedRoutes:list=[],
+							 populationSize:int=POPULATION_SIZE, seed:int=None, startTime:float=None):
+	startTime = time.time() if startTime == None else startTime
+	seeds = np.random.SeedSequence(seed).generate_state(numWorkers)
+	args = [(costMatrix, deadline, seedRoutes, populationSize, int(islandSeed), startTime) for islandSeed in seeds]
+	with multiprocessing.get_context().Pool(numWorkers) as pool:
+		islands = pool.starmap(geneticAlgorithm, args)
+	route, cost, _, history = min(islands, key=lambda island: island[1])
+	return route, cost, sum(island[2] for island in islands), history
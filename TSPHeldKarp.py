@@ -0,0 +1,70 @@
+import math
+import time
+import numpy as np
+
+# Largest instance heldKarp will try: the dp table has 2**(n-1) * (n-1) entries (about 370MB at 23 cities)
+HELD_KARP_MAX_CITIES = 23
+# Most subsets handled in one vectorized step, to bound the temporary (subsets x n) arrays
+HELD_KARP_CHUNK = 2**16
+
+# Exact tour by dynamic programming over subsets (Held-Karp), returns (route as city indices, cost) or None, Time: O(n**2*2**n)
+# dp[mask, j] = cheapest path that leaves city 0, visits exactly the cities in mask and ends at city j, where bit j
+# of mask stands for city j+1. Subsets are filled in layers of equal size, each layer one NumPy step per end city.
+# Returns None if there is no tour or the deadline passes first.
+def heldKarp(costMatrix:np.ndarray, deadline:float=math.inf):
+	ncities = len(costMatrix)
+	if ncities < 2:
+		return None
+	m = ncities - 1
+
+	# Integer costs, with infinite edges replaced by a sentinel that can't overflow when two are added together
+	finite = np.isfinite(costMatrix)
+	longestTour = costMatrix[finite].max(initial=0) * ncities
+	dtype = np.int32 if longestTour < np.iinfo(np.int32).max // 4 else np.int64
+	sentinel = np.iinfo(dtype).max // 2
+	costs = np.where(finite, costMatrix, sentinel).astype(np.int64)
+	pathCosts = costs[1:, 1:] # Between the non-start cities, indexed by bit
+
+	# dp table and the previous city (as a bit index) for each entry, Space: O(n*2**n)
+	dp = np.full((1 << m, m), sentinel, dtype=dtype)
+	parent = np.full((1 << m, m), -1, dtype=np.int8 if m < 128 else np.int16)
+	bits = np.arange(m)
+	dp[1 << bits, bits] = np.minimum(costs[0, 1:], sentinel)
+
+	# Group the subsets by how many cities they hold, Time: O(n*2**n)
+	masks = np.arange(1 << m, dtype=np.int64)
+	sizes = np.zeros(1 << m, dtype=np.int8)
+	for bit in range(m):
+		sizes += ((masks >> bit) & 1).astype(np.int8)
+	order = np.argsort(sizes, kind='stable')
+	layerStarts = np.searchsorted(sizes[order], np.arange(m + 2))
+
+	for size in range(2, m + 1):
+		layer = order[layerStarts[size]:layerStarts[size + 1]]
+		for j in range(m):
+			if time.time() >= deadline:
+				return None
+			ending = layer[(layer >> j) & 1 == 1]
+			for start in range(0, len(ending), HELD_KARP_CHUNK):
+				chunk = ending[start:start + HELD_KARP_CHUNK]
+				# Paths to each subset without j, extended by the edge from their last city to j
+				candidates = dp[chunk ^ (1 << j)].astype(np.int64) + pathCosts[:, j][np.newaxis, :]
+				best = candidates.argmin(axis=1)
+				dp[chunk, j] = np.minimum(candidates[np.arange(len(chunk)), best], sentinel)
+				parent[chunk, j] = best
+
+	# Close the tour back to city 0 and walk the parents back to recover the route, Time: O(n)
+	full = (1 << m) - 1
+	tourCosts = dp[full].astype(np.int64) + costs[1:, 0]
+	last = int(tourCosts.argmin())
+	if tourCosts[last] >= sentinel:
+		return None
+	cost = int(tourCosts[last])
+	route = []
+	mask = full
+	while last != -1:
+		route.append(last + 1)
+		last, mask = int(parent[mask, last]), mask ^ (1 << last)
+	route.append(0)
+	route.reverse()
+	return route, cost
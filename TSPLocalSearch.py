@@ -0,0 +1,315 @@
+import math
+import time
+from collections import deque
+import numpy as np
+from TSPClasses import asCost, routeCosts
+
+# Moves only consider each city's this many nearest cities as new neighbours
+NEIGHBOR_LIST_SIZE = 10
+# Longest run of cities an Or-opt move relocates
+OR_OPT_MAX_SEGMENT = 3
+# Fraction of the time allowance spent building the greedy tour a local search starts from
+SEED_TIME_FRACTION = 0.1
+# Rows of the cost matrix handled at once when building neighbor lists (bounds the temporary arrays)
+NEIGHBOR_LIST_CHUNK = 512
+# How many cities are examined between deadline checks
+DEADLINE_CHECK_INTERVAL = 64
+# Most 2-opt moves chained into one Lin-Kernighan move, and how many choices are tried for the first of them
+LK_MAX_DEPTH = 10
+LK_BREADTH = 5
+
+# Each city's k nearest cities, nearest first, Time: O(n**2)
+# Closeness is the cheaper direction of each edge, so the lists suit asymmetric costs too
+def nearestNeighborLists(costMatrix:np.ndarray, k:int=NEIGHBOR_LIST_SIZE) -> np.ndarray:
+	ncities = len(costMatrix)
+	k = min(k, ncities - 1)
+	neighbors = np.empty((ncities, max(k, 0)), dtype=int)
+	if k <= 0:
+		return neighbors
+	for start in range(0, ncities, NEIGHBOR_LIST_CHUNK):
+		rows = slice(start, start + NEIGHBOR_LIST_CHUNK)
+		closeness = np.minimum(costMatrix[rows], costMatrix[:, rows].T)
+		closeness[np.arange(len(closeness)), np.arange(start, start + len(closeness))] = math.inf
+		nearest = np.argpartition(closeness, k - 1, axis=1)[:, :k]
+		order = np.take_along_axis(closeness, nearest, axis=1).argsort(axis=1, kind='stable')
+		neighbors[rows] = np.take_along_axis(nearest, order, axis=1)
+	return neighbors
+
+
+# A tour as an array of cities in route order plus each city's position in it, Space: O(n)
+# Finding a city's neighbours on the tour is O(1); reversing or moving part of it is one O(n) NumPy step at worst
+class ArrayTour(object):
+	#route:np.ndarray, city at each position
+	#position:np.ndarray, position of each city in route
+	def __init__(self, route):
+		self.route:np.ndarray = np.array(route, dtype=int)
+		self.position:np.ndarray = np.empty(len(self.route), dtype=int)
+		self.position[self.route] = np.arange(len(self.route))
+
+	# Time: O(1)
+	def __len__(self) -> int:
+		return len(self.route)
+
+	# City after the given one, Time: O(1)
+	def next(self, city:int) -> int:
+		return int(self.route[(self.position[city] + 1) % len(self.route)])
+
+	# City before the given one, Time: O(1)
+	def prev(self, city:int) -> int:
+		return int(self.route[self.position[city] - 1])
+
+	# City length-1 places after the given one, Time: O(1)
+	def cityAfter(self, city:int, steps:int) -> int:
+		return int(self.route[(self.position[city] + steps) % len(self.route)])
+
+	# True if city is one of the length cities starting at first, Time: O(1)
+	def inSegment(self, city:int, first:int, length:int) -> bool:
+		return (self.position[city] - self.position[first]) % len(self.route) < length
+
+	# Reverses the path from first to last (in route order), Time: O(n)
+	# If that path wraps around the end of the array, the rest of the tour is reversed instead, which gives the same
+	# cycle travelled the other way (so only use it for symmetric costs)
+	def reverse(self, first:int, last:int):
+		i, j = self.position[first], self.position[last]
+		if i > j:
+			i, j = j + 1, i - 1
+			if i > j:
+				return
+		self.route[i:j + 1] = self.route[i:j + 1][::-1]
+		self.position[self.route[i:j + 1]] = np.arange(i, j + 1)
+
+	# Moves the length cities starting at first (keeping their order) to just after the city after, Time: O(n)
+	def moveSegment(self, first:int, length:int, after:int):
+		ncities = len(self.route)
+		rotated = np.roll(self.route, -self.position[first])
+		segment, rest = rotated[:length], rotated[length:]
+		insertAt = (self.position[after] - self.position[first]) % ncities - length + 1
+		self.route = np.concatenate((rest[:insertAt], segment, rest[insertAt:]))
+		self.position[self.route] = np.arange(ncities)
+
+	# Time: O(n)
+	def cost(self, costMatrix:np.ndarray):
+		return routeCosts(costMatrix, self.route)
+
+
+# Improves a tour with 2-opt moves (symmetric costs only, since they reverse part of the tour) and Or-opt moves
+# (moving runs of up to OR_OPT_MAX_SEGMENT cities, in the same direction, anywhere else), Time: O(k) per city examined
+# Moves only connect a city to its nearest neighbours, and a city is only examined again once a move changes one
+# of its edges (the "don't look" bits are the cities not on the queue). Every move's change in cost is found in O(1).
+# Returns (improved route as city indices, its cost, number of improving moves made) at a local optimum or the deadline
+def localSearch(costMatrix:np.ndarray, route, deadline:float=math.inf, symmetric:bool=False, neighbors:np.ndarray=None,
+				onImprovement=None):
+	moves = [_twoOptMove, _orOptMove] if symmetric else [_orOptMove]
+	tour, _, applied = _improveTour(costMatrix, ArrayTour(route), moves, neighbors, deadline, onImprovement)
+	cost = tour.cost(costMatrix)
+	return tour.route.tolist(), asCost(cost), applied
+
+
+# Lin-Kernighan style variable depth search, Time: O(k*d) per city examined (plus O(n) per move applied)
+# Symmetric costs: chains of up to LK_MAX_DEPTH 2-opt moves from one city, each removing the edge the last one added
+# back to that city, kept only as far as the best total gain (LK_BREADTH alternatives are tried for the first step).
+# Asymmetric costs: Or-3opt moves, which swap two adjacent parts of the tour without reversing either, so the
+# direction of every edge is kept. Or-opt moves are tried on top of both, with the same queue as localSearch.
+# Returns (improved route as city indices, its cost, number of moves tried, number of improving moves made)
+def linKernighan(costMatrix:np.ndarray, route, deadline:float=math.inf, symmetric:bool=False, neighbors:np.ndarray=None,
+				 onImprovement=None):
+	moves = [_linKernighanMove, _orOptMove] if symmetric else [_or3OptMove, _orOptMove]
+	tour, tried, applied = _improveTour(costMatrix, ArrayTour(route), moves, neighbors, deadline, onImprovement)
+	cost = tour.cost(costMatrix)
+	return tour.route.tolist(), asCost(cost), tried, applied
+
+
+# Examines cities off a queue, trying each move in order until one improves the tour, Time: O(k) per city examined
+# A city goes back on the queue when a move changes one of its edges.
+# Each move is called as move(costMatrix, tour, neighborLists, city) -> (cities whose edges changed or None, moves tried)
+# onImprovement(cost), if given, is called with the tour's cost at every deadline check (and at the end) that follows
+# an improving move, Time: O(n) each
+# Returns (the tour, number of moves tried, number of improving moves made)
+def _improveTour(costMatrix:np.ndarray, tour:ArrayTour, moves:list, neighbors:np.ndarray, deadline:float,
+				 onImprovement=None):
+	ncities = len(tour)
+	if neighbors is None:
+		neighbors = nearestNeighborLists(costMatrix)
+	neighborLists = neighbors.tolist()
+	queued = [True] * ncities
+	queue = deque(tour.route.tolist())
+	tried, applied, examined, posted = 0, 0, 0, 0
+
+	# Gains involving two missing edges are inf - inf, which compares as not improving
+	with np.errstate(invalid='ignore'):
+		while len(queue) != 0 and ncities >= 5:
+			examined += 1
+			if examined % DEADLINE_CHECK_INTERVAL == 0:
+				if onImprovement != None and applied > posted:
+					onImprovement(tour.cost(costMatrix))
+					posted = applied
+				if time.time() >= deadline:
+					break
+			city = queue.popleft()
+			queued[city] = False
+			for move in moves:
+				changed, numTried = move(costMatrix, tour, neighborLists, city)
+				tried += numTried
+				if changed != None:
+					applied += 1
+					# Look at every city whose edges just changed again (including this one)
+					for changedCity in changed:
+						if not queued[changedCity]:
+							queued[changedCity] = True
+							queue.append(changedCity)
+					break
+	if onImprovement != None and applied > posted:
+		onImprovement(tour.cost(costMatrix))
+	return tour, tried, applied
+
+
+# Tries to replace city's edge to its successor (then predecessor) with an edge to one of its neighbours, closing
+# the tour by reversing the path between them, returns (the cities whose edges changed or None, moves tried), Time: O(k) + O(n) to apply
+def _twoOptMove(costMatrix:np.ndarray, tour:ArrayTour, neighborLists:list, a:int):
+	tried = 0
+	for forward in (True, False):
+		b = tour.next(a) if forward else tour.prev(a)
+		removed = costMatrix[a, b]
+		for c in neighborLists[a]:
+			added = costMatrix[a, c]
+			# Neighbours are nearest first, so no later one can give a shorter first edge
+			if added >= removed:
+				break
+			d = tour.next(c) if forward else tour.prev(c)
+			if c == b or d == a:
+				continue
+			tried += 1
+			delta = added + costMatrix[b, d] - removed - costMatrix[c, d]
+			if delta < 0:
+				# a->b ... c->d becomes a->c ... b->d (or the mirror image going backwards)
+				if forward:
+					tour.reverse(b, c)
+				else:
+					tour.reverse(c, b)
+				return [a, b, c, d], tried
+	return None, tried
+
+
+# Tries to move the run of 1..OR_OPT_MAX_SEGMENT cities starting at city to just after or before one of the
+# neighbours of its ends, returns (the cities whose edges changed or None, moves tried), Time: O(k) + O(n) to apply
+def _orOptMove(costMatrix:np.ndarray, tour:ArrayTour, neighborLists:list, first:int):
+	tried = 0
+	for length in range(1, OR_OPT_MAX_SEGMENT + 1):
+		if len(tour) < length + 3:
+			break
+		last = tour.cityAfter(first, length - 1)
+		before, after = tour.prev(first), tour.next(last)
+		# What taking the run out saves (infinite if it removes a missing edge)
+		removeGain = costMatrix[before, first] + costMatrix[last, after] - costMatrix[before, after]
+		if not removeGain > 0:
+			continue
+
+		# Between c and its successor, with c leading into the start of the run
+		for c in neighborLists[first]:
+			if c == before or tour.inSegment(c, first, length):
+				continue
+			d = tour.next(c)
+			tried += 1
+			if costMatrix[c, first] + costMatrix[last, d] - costMatrix[c, d] < removeGain:
+				tour.moveSegment(first, length, c)
+				return [before, after, c, d, first, last], tried
+		# Between c's predecessor and c, with the end of the run leading into c
+		for c in neighborLists[last]:
+			if c == after or tour.inSegment(c, first, length):
+				continue
+			b = tour.prev(c)
+			tried += 1
+			if costMatrix[b, first] + costMatrix[last, c] - costMatrix[b, c] < removeGain:
+				tour.moveSegment(first, length, b)
+				return [before, after, b, c, first, last], tried
+	return None, tried
+
+
+# One Lin-Kernighan move from t1 on symmetric costs, returns (the cities whose edges changed or None, moves tried),
+# Time: O(k*d) + O(n*d) to apply
+# With t2 next to t1, each step adds an edge t2-t3 to a neighbour and removes t3's edge to t4 on t2's side, which is
+# the 2-opt move that reverses t2..t4 and leaves t4 next to t1; t4 becomes the next t2. The gain from removing
+# edges minus the edges added must stay positive, and the step that leaves the best tour (closing with t4-t1) wins.
+# Edges added by the chain are never removed by it. The tour is copied before the chain and put back if nothing is gained.
+def _linKernighanMove(costMatrix:np.ndarray, tour:ArrayTour, neighborLists:list, t1:int):
+	tried = 0
+	for firstChoice in range(LK_BREADTH):
+		start = (tour.route.copy(), tour.position.copy())
+		best, bestGain = None, 0
+		forward = True
+		t2 = tour.next(t1)
+		gain = costMatrix[t1, t2]
+		added = set()
+		changed = [t1, t2]
+
+		for depth in range(LK_MAX_DEPTH):
+			successor = tour.next if forward else tour.prev
+			predecessor = tour.prev if forward else tour.next
+			candidates = []
+			for t3 in neighborLists[t2]:
+				partialGain = gain - costMatrix[t2, t3]
+				# Neighbours are nearest first, so no later one keeps the gain positive
+				if partialGain <= 0:
+					break
+				if t3 == t1 or t3 == successor(t2):
+					continue
+				t4 = predecessor(t3)
+				if (min(t3, t4), max(t3, t4)) in added:
+					continue
+				tried += 1
+				candidates.append((partialGain + costMatrix[t4, t3], t3, t4))
+			choice = firstChoice if depth == 0 else 0
+			if len(candidates) <= choice:
+				break
+			candidates.sort(reverse=True)
+			gain, t3, t4 = candidates[choice]
+
+			# Reverse t2..t4 (as seen in the current direction); if the array flipped the other way, follow it
+			if forward:
+				tour.reverse(t2, t4)
+			else:
+				tour.reverse(t4, t2)
+			forward = tour.next(t1) == t4
+			added.add((min(t2, t3), max(t2, t3)))
+			changed += [t3, t4]
+			closingGain = gain - costMatrix[t4, t1]
+			if closingGain > bestGain:
+				best, bestGain = (tour.route.copy(), tour.position.copy()), closingGain
+			t2 = t4
+
+		tour.route, tour.position = best if best != None else start
+		if best != None:
+			return changed, tried
+	return None, tried
+
+
+# One Or-3opt move from t1 on any costs, returns (the cities whose edges changed or None, moves tried), Time: O(k**2) + O(n) to apply
+# Removes t1->t2, t3->t4 and t5->t6 (in tour order from t2) and adds t1->t4, t3->t6 and t5->t2, which swaps the parts
+# t2..t3 and t4..t5 without reversing either. t4 is a neighbour of t1 and t6 a neighbour of t3, and the gain so far
+# must stay positive after each added edge.
+def _or3OptMove(costMatrix:np.ndarray, tour:ArrayTour, neighborLists:list, t1:int):
+	tried = 0
+	ncities = len(tour)
+	t2 = tour.next(t1)
+	position = tour.position
+	for t4 in neighborLists[t1]:
+		if t4 == t2:
+			continue
+		gain = costMatrix[t1, t2] - costMatrix[t1, t4]
+		if not gain > 0:
+			continue
+		t3 = tour.prev(t4)
+		gain += costMatrix[t3, t4]
+		offset4 = (position[t4] - position[t2]) % ncities
+		for t6 in neighborLists[t3]:
+			partialGain = gain - costMatrix[t3, t6]
+			# t6 has to come after t4 (t1 is the last city going forward from t2)
+			if not partialGain > 0 or (position[t6] - position[t2]) % ncities <= offset4:
+				continue
+			t5 = tour.prev(t6)
+			tried += 1
+			if partialGain + costMatrix[t5, t6] - costMatrix[t5, t2] > 0:
+				# t2..t3 (offset4 cities) moves to just after t5
+				tour.moveSegment(t2, offset4, t5)
+				return [t1, t2, t3, t4, t5, t6], tried
+	return None, tried
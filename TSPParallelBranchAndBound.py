@@ -0,0 +1,240 @@
+import math
+import multiprocessing
+import os
+import time
+import numpy as np
+from multiprocessing import shared_memory
+from queue import Empty
+from TSPBranchAndBound import ArrayState, BranchAndBoundSearch, orientationCities, rootStateFromCostMatrix
+from TSPClasses import City, routeCosts
+
+# The root is split until there are about this many subtrees per worker, so early finishers still have work to take
+TASKS_PER_WORKER = 4
+# How many expansions a worker does between checks for idle workers to hand work to
+STEAL_CHECK_INTERVAL = 32
+# How long an idle worker waits on the task queue before checking if the search is over (seconds)
+TASK_POLL_TIMEOUT = 0.01
+# How long past the deadline to wait for a worker to report, and how often to check whether the workers that have not
+# reported yet are still running (seconds)
+RESULT_GRACE_PERIOD = 10.0
+RESULT_POLL_INTERVAL = 0.5
+
+# Branch and bound search whose bssf cost is shared with other processes, which may be running other solvers
+# Picks up a cheaper cost posted by any of them before each expansion, and posts every cheaper route it finds
+class SharedBssfSearch(BranchAndBoundSearch):
+	#sharedBssfCost:multiprocessing.Value('d'), lowest tour cost any process has found
+	def __init__(self, rootState:ArrayState, sharedBssfCost, bssfCost=math.inf, **searchOptions):
+		super().__init__(rootState, min(bssfCost, sharedBssfCost.value), **searchOptions)
+		self.sharedBssfCost = sharedBssfCost
+
+	# Time: O(1), or O(n**2) to eliminate edges when the shared cost is lower
+	def _refreshBssf(self):
+		sharedCost = self.sharedBssfCost.value
+		if sharedCost < self.bssfCost:
+			self.bssfCost = sharedCost
+			self._eliminateEdges()
+
+	# Records the route and broadcasts its cost if it beats every process's bssf, Time: O(n)
+	def _foundSolution(self, route:list, cost:int):
+		super()._foundSolution(route, cost)
+		postBssfCost(self.sharedBssfCost, cost)
+
+
+# Lowers the shared bssf cost (a multiprocessing.Value('d')) to cost if it beats what every process has posted, Time: O(1)
+# Solvers that are not branch and bound post their tours with this too, so a search sharing the value prunes with them
+def postBssfCost(sharedBssfCost, cost:float):
+	with sharedBssfCost.get_lock():
+		if cost < sharedBssfCost.value:
+			sharedBssfCost.value = cost
+
+
+# Branch and bound search run inside a worker process, Space: O(qlen + n**3)
+# The bssf cost is shared by every worker, and part of the queue is handed off whenever another worker is idle
+class SharedBranchAndBoundSearch(SharedBssfSearch):
+	#taskQueue:multiprocessing.Queue, routes (lists of city indices) waiting for a worker
+	#outstandingTasks:multiprocessing.Value('i'), tasks queued or being searched (the search is over when it is 0)
+	#idleWorkers:multiprocessing.Value('i'), workers waiting for a task
+	def __init__(self, rootState:ArrayState, sharedBssfCost, taskQueue, outstandingTasks, idleWorkers, startTime:float, costMatrix:np.ndarray,
+				 symmetric:bool=False):
+		super().__init__(rootState, sharedBssfCost, startTime=startTime, costMatrix=costMatrix, symmetric=symmetric)
+		self.taskQueue = taskQueue
+		self.outstandingTasks = outstandingTasks
+		self.idleWorkers = idleWorkers
+		self._expansions:int = 0
+
+	# Picks up bssf improvements from other workers, and hands work to idle ones every so often, Time: O(1) (O(qlen) to hand off)
+	def _refreshBssf(self):
+		super()._refreshBssf()
+
+		self._expansions += 1
+		if self._expansions % STEAL_CHECK_INTERVAL == 0 and len(self.frontier) > 1:
+			idle = self.idleWorkers.value
+			if idle > 0:
+				self._handOff(min(idle, len(self.frontier) // 2))
+
+	# Moves k of the shallowest queued states onto the shared task queue, Time: O(qlen)
+	def _handOff(self, k:int):
+		nodes = self.frontier.removeShallowest(k)
+		with self.outstandingTasks.get_lock():
+			self.outstandingTasks.value += len(nodes)
+		for node in nodes:
+			self.taskQueue.put(node.routeIndices())
+
+
+# Entry point of a worker process: searches tasks until the deadline or until no tasks are left, Space: O(qlen + n**3)
+# The cost matrix is read from shared memory; the results are put on resultQueue as
+# (workerIndex, best route as city indices or None, count, max queue size, total states, pruned states)
+def _branchAndBoundWorker(workerIndex:int, matrixName:str, ncities:int, cityData:list, taskQueue, resultQueue,
+						  sharedBssfCost, outstandingTasks, idleWorkers, startTime:float, deadline:float, symmetric:bool):
+	memory = shared_memory.SharedMemory(name=matrixName)
+	try:
+		# Read straight from the shared block for the whole search, so the root's reduced matrix is the only private copy
+		costMatrix = np.ndarray((ncities, ncities), dtype=float, buffer=memory.buf)
+		costMatrix.flags.writeable = False
+		cities = [City(x, y, elevation, index, name) for x, y, elevation, index, name in cityData]
+		rootState = rootStateFromCostMatrix(cities, costMatrix) # Copies the matrix, Time: O(n**2)
+		search = SharedBranchAndBoundSearch(rootState, sharedBssfCost, taskQueue, outstandingTasks, idleWorkers, startTime, costMatrix, symmetric)
+
+		with idleWorkers.get_lock():
+			idleWorkers.value += 1
+		while time.time() < deadline:
+			try:
+				route = taskQueue.get(timeout=TASK_POLL_TIMEOUT)
+			except Empty:
+				# Below 0 once the search was given up on (a worker died with a task)
+				if outstandingTasks.value <= 0:
+					break
+				continue
+
+			with idleWorkers.get_lock():
+				idleWorkers.value -= 1
+			search.pushRoute(route)
+			# A task cut off by the deadline stays outstanding, so the search is not reported as finished
+			if search.run(deadline):
+				with outstandingTasks.get_lock():
+					outstandingTasks.value -= 1
+			with idleWorkers.get_lock():
+				idleWorkers.value += 1
+
+		bestRoute = None if search.bssfRoute == None else [city._index for city in search.bssfRoute]
+		resultQueue.put((workerIndex, bestRoute, search.count, search.maxQueueLen, search.totalStatesCreated, search.totalStatesPruned))
+	finally:
+		# The block can only be closed once nothing points into it
+		search = costMatrix = None
+		memory.close()
+
+
+# Splits the tree below the root breadth first until there are enough subtrees for every worker, Time: O(t*n**2)
+# Routes that visit orientation[1] before orientation[0] (if given) are left out, as in BranchAndBoundSearch
+# Returns (routes of the subtrees cheapest bound first, complete routes found on the way, states created, states pruned)
+def _splitRoot(rootState:ArrayState, bssfCost, numTasks:int, orientation:tuple=None):
+	level = [([], rootState)]
+	solutions = []
+	totalStatesCreated, totalStatesPruned = 0, 0
+	while 0 < len(level) < numTasks:
+		nextLevel = []
+		for route, state in level:
+			for nextCity in state.unvisitedCitiesSet:
+				if orientation != None and nextCity._index == orientation[1] and orientation[0] not in route:
+					continue
+				childState = state.copy()
+				totalStatesCreated += 1
+				childState.visitCity(nextCity)
+				childRoute, cost = childState.getSolution()
+				if childRoute != None:
+					solutions.append((childRoute, cost))
+				elif childState.shouldPrune(bssfCost):
+					totalStatesPruned += 1
+				else:
+					nextLevel.append((route + [nextCity._index], childState))
+		level = nextLevel
+	level.sort(key=lambda entry: entry[1].costSoFar)
+	return [route for route, _ in level], solutions, totalStatesCreated, totalStatesPruned
+
+
+# Runs branch and bound on numWorkers processes that share the bssf cost and hand work to each other, Space: O(w*(qlen + n**3))
+# Returns a dict with the best route found (list of cities, None if nothing beat bssfCost), whether the whole tree was
+# searched, count/total/pruned summed over the workers, max the largest queue any one worker had, and how many
+# workers failed (exited or hung without reporting, so their subtrees were not searched and finished is False)
+def parallelBranchAndBound(cities:list[City], costMatrix:np.ndarray, bssfCost, deadline:float, numWorkers:int=None, startTime:float=None,
+						   symmetric:bool=False):
+	numWorkers = os.cpu_count() if numWorkers == None else numWorkers
+	startTime = time.time() if startTime == None else startTime
+	stats = {'route': None, 'finished': False, 'count': 0, 'max': 0, 'total': 1, 'pruned': 0, 'failed': 0}
+	bestCost = bssfCost
+
+	# Split the root into subtrees (finding any complete routes on the way for tiny instances), on the same costMatrix
+	# the workers search
+	rootState = rootStateFromCostMatrix(cities, costMatrix) # Time: O(n**2)
+	orientation = orientationCities(costMatrix, cities[0]._index) if symmetric else None
+	routes, solutions, created, pruned = _splitRoot(rootState, bssfCost, TASKS_PER_WORKER * numWorkers, orientation)
+	stats['total'] += created
+	stats['pruned'] += pruned
+	for route, cost in solutions:
+		stats['count'] += 1
+		if cost < bestCost:
+			bestCost, stats['route'] = cost, route
+	if len(routes) == 0:
+		stats['finished'] = True
+		return stats
+
+	context = multiprocessing.get_context()
+	taskQueue, resultQueue = context.Queue(), context.Queue()
+	sharedBssfCost = context.Value('d', float(bestCost))
+	outstandingTasks = context.Value('i', len(routes))
+	idleWorkers = context.Value('i', 0)
+	for route in routes:
+		taskQueue.put(route)
+
+	# Share the read-only cost matrix instead of copying it to every worker
+	memory = shared_memory.SharedMemory(create=True, size=max(costMatrix.nbytes, 1))
+	try:
+		np.ndarray(costMatrix.shape, dtype=float, buffer=memory.buf)[:] = costMatrix
+		cityData = [(city._x, city._y, city._elevation, city._index, city._name) for city in cities]
+		workers = [context.Process(target=_branchAndBoundWorker, daemon=True,
+								   args=(index, memory.name, len(cities), cityData, taskQueue, resultQueue,
+										 sharedBssfCost, outstandingTasks, idleWorkers, startTime, deadline, symmetric))
+				   for index in range(numWorkers)]
+		for worker in workers:
+			worker.start()
+
+		# Collect every worker's results (they stop on their own at the deadline). A worker that exits without
+		# reporting took its task with it, so the others are told to stop once the queue is empty rather than wait
+		# for that task until the deadline.
+		pending = set(range(numWorkers))
+		resultDeadline = deadline + RESULT_GRACE_PERIOD
+		while len(pending) != 0 and time.time() < resultDeadline:
+			try:
+				index, route, count, maxQueueLen, created, pruned = resultQueue.get(
+					timeout=min(max(resultDeadline - time.time(), 0), RESULT_POLL_INTERVAL))
+			except Empty:
+				dead = [index for index in pending if workers[index].exitcode != None]
+				for index in dead:
+					print(f"Branch and bound worker {index} exited with code {workers[index].exitcode} without reporting")
+					pending.remove(index)
+					stats['failed'] += 1
+				if len(dead) != 0:
+					with outstandingTasks.get_lock():
+						outstandingTasks.value = -1
+				continue
+			pending.remove(index)
+			stats['count'] += count
+			stats['max'] = max(stats['max'], maxQueueLen)
+			stats['total'] += created
+			stats['pruned'] += pruned
+			if route != None:
+				cost = routeCosts(costMatrix, route)
+				if cost < bestCost:
+					bestCost, stats['route'] = cost, [cities[index] for index in route]
+		for index in pending:
+			print(f"Branch and bound worker {index} did not report by {RESULT_GRACE_PERIOD}s past the deadline")
+		stats['failed'] += len(pending)
+		for worker in workers:
+			worker.join(timeout=1.0)
+			if worker.is_alive():
+				worker.terminate()
+		stats['finished'] = outstandingTasks.value == 0 and stats['failed'] == 0
+	finally:
+		memory.close()
+		memory.unlink()
+	return stats
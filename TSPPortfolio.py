@@ -0,0 +1,81 @@
+import inspect
+import math
+import multiprocessing
+import time
+from queue import Empty
+from TSPClasses import Scenario, TSPSolution
+from TSPParallelBranchAndBound import postBssfCost
+
+# TSPSolver algorithms raced by default: quick constructions post an incumbent early, the local searches improve on
+# it, and branch and bound prunes with the best of them
+PORTFOLIO_ALGORITHMS = ('greedy', 'cheapestInsertion', 'linKernighan', 'simulatedAnnealing', 'genetic', 'branchAndBound')
+# How long past the deadline to wait for a solver to report before stopping it, and how often to check whether the
+# ones that have not reported yet are still running (seconds)
+RESULT_GRACE_PERIOD = 10.0
+RESULT_POLL_INTERVAL = 0.5
+
+# Runs each algorithm (a TSPSolver method name) in its own process on the same scenario until the deadline
+# Solvers that take a sharedBssfCost post every cheaper tour to the shared incumbent as they find it (the rest post
+# theirs when they finish), and branch and bound prunes with the lowest one posted so far (see
+# TSPParallelBranchAndBound.SharedBssfSearch). Solvers that would start worker
+# processes of their own (numWorkers) get one each, since the portfolio already uses every core.
+# Returns (results dict of the cheapest solution, the algorithm that found it, {algorithm: its cost}), or
+# (None, None, {...}) if no solver reported a tour
+def runPortfolio(scenario:Scenario, time_allowance:float, algorithms:tuple=PORTFOLIO_ALGORITHMS, startTime:float=None):
+	startTime = time.time() if startTime == None else startTime
+	deadline = startTime + time_allowance
+	scenario.getCostMatrix() # Built once here instead of in every worker
+	context = multiprocessing.get_context()
+	resultQueue = context.Queue()
+	sharedBssfCost = context.Value('d', math.inf)
+	# Not daemons, so solvers can start processes of their own (e.g. parallelBranchAndBound)
+	workers = [context.Process(target=_portfolioWorker,
+							   args=(scenario, algorithm, deadline, sharedBssfCost, resultQueue))
+			   for algorithm in algorithms]
+	for worker in workers:
+		worker.start()
+
+	# Collect every solver's results (they stop on their own at the deadline) until all of them have reported, the
+	# grace period is over, or the ones left have exited without reporting
+	best, winner, costs = None, None, {}
+	numReported = 0
+	resultDeadline = deadline + RESULT_GRACE_PERIOD
+	while numReported < len(workers) and time.time() < resultDeadline:
+		try:
+			algorithm, route, results = resultQueue.get(timeout=min(max(resultDeadline - time.time(), 0),
+																	 RESULT_POLL_INTERVAL))
+		except Empty:
+			if not any(worker.is_alive() for worker in workers):
+				break
+			continue
+		numReported += 1
+		costs[algorithm] = results['cost']
+		if route != None and (best == None or results['cost'] < best['cost']):
+			results['solution'] = TSPSolution.fromIndices(route, scenario.getCities(), scenario.getCostMatrix())
+			best, winner = results, algorithm
+	for worker in workers:
+		worker.join(timeout=1.0)
+		if worker.is_alive():
+			worker.terminate()
+	return best, winner, costs
+
+
+# Entry point of a portfolio process: runs one TSPSolver algorithm until the deadline and posts its final tour's cost
+# The results are put on resultQueue as (algorithm, route as city indices or None, results without the solution)
+def _portfolioWorker(scenario:Scenario, algorithm:str, deadline:float, sharedBssfCost, resultQueue):
+	from TSPSolver import TSPSolver # TSPSolver imports this module
+	solver = TSPSolver()
+	solver.setupWithScenario(scenario)
+	solve = getattr(solver, algorithm)
+	options = {}
+	parameters = inspect.signature(solve).parameters
+	if 'sharedBssfCost' in parameters:
+		options['sharedBssfCost'] = sharedBssfCost
+	if 'numWorkers' in parameters:
+		options['numWorkers'] = 1
+	results = solve(time_allowance=max(deadline - time.time(), 0), **options)
+
+	solution = results.pop('solution')
+	route = None if solution == None else solution.indices.tolist()
+	postBssfCost(sharedBssfCost, results['cost'])
+	resultQueue.put((algorithm, route, results))
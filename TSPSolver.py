@@ -1,7 +1,16 @@
 #!/usr/bin/python3
 
-from queue import PriorityQueue
-from TSPBranchAndBound import PriorityEntry, State
+from TSPAnnealing import parallelAnnealing, simulatedAnnealing
+from TSPAntColony import antColony
+from TSPBounds import BOUND_FUNCTIONS, oneTreeLowerBound
+from TSPBranchAndBound import ArrayState, BranchAndBoundSearch
+from TSPConstruction import cheapestInsertionTour, farthestInsertionTour, nearestNeighborTours, randomTours
+from TSPDecomposition import DENSE_MAX_CITIES, decomposedTour
+from TSPGenetic import geneticAlgorithm, parallelGeneticAlgorithm
+from TSPHeldKarp import HELD_KARP_MAX_CITIES, heldKarp
+from TSPLocalSearch import SEED_TIME_FRACTION, linKernighan, localSearch
+from TSPParallelBranchAndBound import SharedBssfSearch, parallelBranchAndBound, postBssfCost
+from TSPPortfolio import PORTFOLIO_ALGORITHMS, runPortfolio
 from which_pyqt import PYQT_VER
 if PYQT_VER == 'PYQT5':
 	from PyQt5.QtCore import QLineF, QPointF
@@ -10,10 +19,15 @@ elif PYQT_VER == 'PYQT4':
 else:
 	raise Exception('Unsupported Version of PyQt: {}'.format(PYQT_VER))
 
+import functools
+import os
 import time
 import numpy as np
 from TSPClasses import *
 
+# Solvers whose cheapest tour branch and bound starts from as its bssf
+BSSF_SEEDERS = ('greedy', 'cheapestInsertion', 'farthestInsertion')
+
 class TSPSolver:
 	def __init__( self, gui_view=None ):
 		self._scenario = None
@@ -33,29 +47,18 @@ class TSPSolver:
 		algorithm</returns> 
 	'''
 	
-	# Randomly generate route and check validity while under the time range
-	#   Returns the first found solution
+	# Randomly generate routes in batches while under the time range, Time: O(x*b*n*log(n))
+	#   Returns the cheapest valid route of the first batch that has one; count is the number of routes tried
 	def defaultRandomTour(self, time_allowance=60.0):
 		results = {}
 		cities = self._scenario.getCities()
-		foundTour = False
-		count = 0
 		solution = None
 		start_time = time.time()
-		while not foundTour and time.time() - start_time < time_allowance:
-			# create a random permutation
-			perm = np.random.permutation(len(cities))
-			route = []
-			# Now build the route using the random permutation
-			for i in range(len(cities)):
-				route.append(cities[perm[i]])
-			solution = TSPSolution(route)
-			count += 1
-			if solution.cost < np.inf:
-				# Found a valid route
-				foundTour = True
+		route, cost, count = randomTours(self._scenario.getCostMatrix(), start_time + time_allowance)
+		if route != None:
+			solution = TSPSolution.fromIndices(route, cities, self._scenario.getCostMatrix())
 		end_time = time.time()
-		results['cost'] = solution.cost if foundTour else math.inf
+		results['cost'] = cost
 		results['time'] = end_time - start_time
 		results['count'] = count
 		results['solution'] = solution
@@ -77,59 +80,65 @@ class TSPSolver:
 		algorithm</returns> 
 	'''
 
-	# Returns the first greedy solution found, Time: O(x*n**2)
-	def greedy(self, time_allowance=60.0, startCity=None):
+	# Returns the best nearest neighbor tour from every start city (startCity first), Time: O(n**3)
+	# The starts run side by side on the cost matrix (see TSPConstruction.nearestNeighborTours); count is how many were tried
+	# With a sharedBssfCost, each cheaper tour's cost is posted there as it is found (see _costPoster)
+	def greedy(self, time_allowance=60.0, startCity=None, sharedBssfCost=None):
 		# Setup objects
 		results = {}
 		cities = self._scenario.getCities()
-		foundTour = False
-		count = 0
-		solution = None
 		start_time = time.time()
-		if startCity == None:
-			startCity = cities[0]
-		
-		# Time: O(x*n**2)
-		while not foundTour and time.time() - start_time < time_allowance:
-			unvisitedCitiesSet = set(cities)
-			route = []
-			currentCity = startCity
-
-			# Build the route greedily, Time: O(n**2)
-			for _ in range(len(cities)):
-				greedyCost, nextCity = None, None
-				# Iterate to find the smallest unvisited edge, Time: O(n)
-				for unvisitedCity in unvisitedCitiesSet:
-					cost = currentCity.costTo(unvisitedCity)
-					# Save the smallest city (or any city, if none have been visited)
-					if greedyCost == None or cost < greedyCost:
-						greedyCost, nextCity = cost, unvisitedCity
-
-				# Visit the smallest edge, Time: O(1)
-				if nextCity != None:
-					unvisitedCitiesSet.remove(nextCity)
-					route.append(nextCity)
-					currentCity = nextCity
-				else:
-					raise Exception("Unable to visit any city!!")
-			
-			solution = TSPSolution(route)
-			count += 1
-			if solution.cost < np.inf:
-				# Found a valid route
-				foundTour = True
-			else:
-				# Choose a new random city as the start city and try again
-				startCity = random.choice(cities)
+		starts = list(range(len(cities)))
+		if startCity != None:
+			starts.remove(startCity._index)
+			starts.insert(0, startCity._index)
+
+		# Time: O(n**3)
+		route, cost, count = nearestNeighborTours(self._scenario.getCostMatrix(), starts, start_time + time_allowance,
+												  onImprovement=self._costPoster(sharedBssfCost))
+		solution = TSPSolution.fromIndices(route, cities, self._scenario.getCostMatrix())
 
 		# Return results
 		end_time = time.time()
-		results['cost'] = solution.cost if foundTour else math.inf
+		results['cost'] = cost
 		results['time'] = end_time - start_time
 		results['count'] = count
 		results['solution'] = solution
 		results['max'], results['total'], results['pruned'] = None, None, None
 		return results
+
+	# Callback the heuristics call with each cheaper tour's cost, posting it to sharedBssfCost (a multiprocessing.Value)
+	# so a branch and bound search sharing it prunes with it right away (see TSPPortfolio), or None without one
+	@staticmethod
+	def _costPoster(sharedBssfCost):
+		return None if sharedBssfCost == None else functools.partial(postBssfCost, sharedBssfCost)
+	
+	
+	
+	# Cheapest insertion tour (see TSPConstruction.cheapestInsertionTour), Time: O(n**2); count is the tours built
+	def cheapestInsertion(self, time_allowance=60.0):
+		return self._insertion(cheapestInsertionTour)
+
+	# Farthest insertion tour (see TSPConstruction.farthestInsertionTour), Time: O(n**2); count is the tours built
+	def farthestInsertion(self, time_allowance=60.0):
+		return self._insertion(farthestInsertionTour)
+
+	# Results for a tour built by buildTour(costMatrix), Time: O(n**2)
+	def _insertion(self, buildTour):
+		results = {}
+		cities = self._scenario.getCities()
+		start_time = time.time()
+		route, cost = buildTour(self._scenario.getCostMatrix())
+		solution = TSPSolution.fromIndices(route, cities, self._scenario.getCostMatrix())
+
+		# Return results
+		end_time = time.time()
+		results['cost'] = cost
+		results['time'] = end_time - start_time
+		results['count'] = 1
+		results['solution'] = solution
+		results['max'], results['total'], results['pruned'] = None, None, None
+		return results
 	
 	
 	
@@ -143,79 +152,149 @@ class TSPSolver:
 	'''
 
 	# Continues searching for a better solution until the time runs out or the queue is empty, Time: O(qlen*n**3)
-	def branchAndBound(self, time_allowance=60.0, givenBssf=None):
+	# If maxQueueSize is given, states that would grow the queue past it are searched depth first in place instead
+	# In symmetric scenarios only one direction of each route is searched (see TSPBranchAndBound.orientationCities)
+	# bound picks the lower bound function by name from TSPBounds.BOUND_FUNCTIONS
+	# Without a givenBssf, it starts from the cheapest tour of the solvers named in seeders (see _seedBssf)
+	# With a sharedBssfCost (multiprocessing.Value), it also prunes with tour costs other processes post there
+	def branchAndBound(self, time_allowance=60.0, givenBssf=None, maxQueueSize=None, bound='reduced', seeders=BSSF_SEEDERS,
+					   sharedBssfCost=None):
 		print("**Branch and Bound**")
 		# Setup objects
 		results:object = {}
 		cities:list[City] = self._scenario.getCities()
 		bssf:TSPSolution = givenBssf
 		start_time:float = time.time()
-		rootState:State = State(cities=cities)
-		count:int = 0
+		rootState:ArrayState = ArrayState(cities=cities)
 		
-		# Start with a greedy solution as the bssf, Time: O(x*n**2)
+		# Start with the cheapest of the seeders' solutions as the bssf, Time: O(n**3)
 		if bssf == None:
-			greedyResult = self.greedy(time_allowance=time_allowance-(time.time() - start_time))
-			bssf:TSPSolution = greedyResult['solution']
+			bssf:TSPSolution = self._seedBssf(time_allowance-(time.time() - start_time), seeders)
 			print(f"({'{: >5}'.format(round(time.time() - start_time, 2))}s)  BSSF:{bssf}")
 
-		# Priority queue of (priorityNum, State) (Note: anything on the queue is NOT a solution yet)
-		pQueue = PriorityQueue() 
-		pQueue.put(PriorityEntry(0, 0, rootState))
-		maxQueueLen:int = 1
-		totalStatesCreated:int = 1
-		totalStatesPruned:int = 0
-
-		# Continue searching and expanding states on the queue until time is up or nothing is left, Time: O(qlen*n**3)
-		while pQueue.qsize() != 0 and time.time() - start_time < time_allowance:
-			state:State = pQueue.get().data
-			# If the bssf has changed between adding to the queue vs coming off, prune it
-			if state.shouldPrune(bssf.cost):
-				totalStatesPruned += 1
-				del state
-				continue
-			# print(state.str_routeSoFar())
-
-			# Expand and evaluate "children" aka a next possible unvisitedCity, Time: O(n**3)
-			for nextCity in state.unvisitedCitiesSet:
-				childState = state.copy() # Time: O(n)
-				totalStatesCreated += 1
-				childState.visitCity(nextCity) # Time: O(n**2)
-				# print(f"    Child:{childState.str_routeSoFar()}", end="")
-				
-				# See if there is a solution yet
-				route, cost = childState.getSolution() # Time: O(1)
-				# If this is not a valid solution yet,
-				if route == None or cost == None:
-					if not childState.shouldPrune(bssf.cost): # Time: O(1)
-						# Prioritize state and put back on the queue
-						pQueue.put(PriorityEntry(len(childState.cities)-len(childState.unvisitedCitiesSet), childState.costSoFar, childState))
-						# print(f": added to queue")
-						if pQueue.qsize() > maxQueueLen:
-							maxQueueLen = pQueue.qsize()
-					# If it should be pruned, it does not go back on the queue
-					else:
-						# print(f": pruned")
-						totalStatesPruned += 1
-						del childState
-				
-				# If it is a solution, then see if it is better than bssf, Time: O(1)
-				else:
-					solution = TSPSolution(route)
-					print(f"({'{: >5}'.format(round(time.time() - start_time, 2))}s)  BranchAndBound:{solution}")
-					count += 1
-					if solution.cost < bssf.cost:
-						bssf = solution
+		# Search from the root until time is up or nothing is left, Time: O(qlen*n**3)
+		boundFunction = BOUND_FUNCTIONS[bound](self._scenario.getCostMatrix(), upperBound=bssf.cost)
+		searchOptions = {'maxQueueSize': maxQueueSize, 'startTime': start_time, 'boundFunction': boundFunction,
+						 'symmetric': self._scenario.isSymmetric()}
+		if sharedBssfCost == None:
+			search = BranchAndBoundSearch(rootState, bssf.cost, **searchOptions)
+		else:
+			search = SharedBssfSearch(rootState, sharedBssfCost, bssf.cost, **searchOptions)
+		search.pushRoute()
+		search.totalStatesCreated += 1 # the root
+		search.run(start_time + time_allowance)
+		if search.bssfRoute != None:
+			bssf = TSPSolution(search.bssfRoute)
 
 		# Return results
 		end_time = time.time()
 		results['cost'] = bssf.cost
 		results['time'] = end_time - start_time
-		results['count'] = count
+		results['count'] = search.count
 		results['solution'] = bssf
-		results['max'] = maxQueueLen
-		results['total'] = totalStatesCreated
-		results['pruned'] = totalStatesPruned
+		results['max'] = search.maxQueueLen
+		results['total'] = search.totalStatesCreated
+		results['pruned'] = search.totalStatesPruned
+		results['lowerBound'] = search.lowerBound()
+		results['eliminated'] = search.eliminatedEdges
+		results['dominated'] = search.transpositions.hits
+		return results
+
+	# Cheapest solution from the solvers named in seeders, each given what is left of time_allowance, Time: O(n**3)
+	def _seedBssf(self, time_allowance, seeders=BSSF_SEEDERS) -> TSPSolution:
+		start_time = time.time()
+		solutions = [getattr(self, seeder)(time_allowance=time_allowance - (time.time() - start_time))['solution']
+					 for seeder in seeders]
+		return min(solutions, key=lambda solution: solution.cost)
+
+	# Branch and bound that never queues more than maxQueueSize states (see branchAndBound), Time: O(qlen*n**3)
+	def hybridBranchAndBound(self, time_allowance=60.0, givenBssf=None, maxQueueSize=100000):
+		return self.branchAndBound(time_allowance=time_allowance, givenBssf=givenBssf, maxQueueSize=maxQueueSize)
+
+	# Branch and bound with the assignment problem bound instead of the reduced cost bound (see branchAndBound)
+	def assignmentBranchAndBound(self, time_allowance=60.0, givenBssf=None):
+		return self.branchAndBound(time_allowance=time_allowance, givenBssf=givenBssf, bound='assignment')
+
+	# Branch and bound with the Held-Karp 1-tree bound (see branchAndBound), strongest on symmetric (Easy) scenarios
+	def oneTreeBranchAndBound(self, time_allowance=60.0, givenBssf=None):
+		return self.branchAndBound(time_allowance=time_allowance, givenBssf=givenBssf, bound='oneTree')
+
+	# Branch and bound split across numWorkers processes (default: one per core) that share the bssf, Time: O(qlen*n**3/w)
+	# The counts in the results are summed over all the workers, except max, the largest queue any one worker had
+	# 'failedWorkers' counts workers that died without reporting; their subtrees go unsearched, so there is no lowerBound
+	def parallelBranchAndBound(self, time_allowance=60.0, givenBssf=None, numWorkers=None, seeders=BSSF_SEEDERS):
+		print("**Parallel Branch and Bound**")
+		# Setup objects
+		results:object = {}
+		cities:list[City] = self._scenario.getCities()
+		bssf:TSPSolution = givenBssf
+		start_time:float = time.time()
+
+		# Start with the cheapest of the seeders' solutions as the bssf, Time: O(n**3)
+		if bssf == None:
+			bssf:TSPSolution = self._seedBssf(time_allowance, seeders)
+			print(f"({'{: >5}'.format(round(time.time() - start_time, 2))}s)  BSSF:{bssf}")
+
+		stats = parallelBranchAndBound(cities, self._scenario.getCostMatrix(), bssf.cost, start_time + time_allowance,
+									   numWorkers=numWorkers, startTime=start_time, symmetric=self._scenario.isSymmetric())
+		if stats['route'] != None:
+			bssf = TSPSolution(stats['route'])
+
+		# Return results
+		end_time = time.time()
+		results['cost'] = bssf.cost
+		results['time'] = end_time - start_time
+		results['count'] = stats['count']
+		results['solution'] = bssf
+		results['max'] = stats['max']
+		results['total'] = stats['total']
+		results['pruned'] = stats['pruned']
+		results['lowerBound'] = bssf.cost if stats['finished'] else None
+		results['failedWorkers'] = stats['failed']
+		return results
+
+
+
+	# Adds a lower bound on every tour of the scenario to a solver's results as 'lowerBound' (the Held-Karp 1-tree
+	# bound, or the solver's own bound if that is higher) and how far the tour found is above it as 'gap', Time: O(i*n**2)
+	# Scenarios over DENSE_MAX_CITIES get no new bound, since it would need the full cost matrix
+	def addLowerBound(self, results:dict, time_allowance=5.0):
+		if len(self._scenario.getCities()) > DENSE_MAX_CITIES:
+			results.setdefault('lowerBound', None)
+			results['gap'] = None
+			return results
+		start_time = time.time()
+		cost = results['cost']
+		bound, _ = oneTreeLowerBound(self._scenario.getCostMatrix(), upperBound=cost, deadline=start_time + time_allowance)
+		if results.get('lowerBound') != None:
+			bound = max(bound, results['lowerBound'])
+		results['lowerBound'] = bound
+		results['gap'] = (cost - bound) / bound if 0 < bound < math.inf and cost < math.inf else None
+		return results
+
+	# Exact solver for small instances (up to HELD_KARP_MAX_CITIES cities) by Held-Karp dynamic programming, Time: O(n**2*2**n)
+	# Unlike branch and bound its run time doesn't depend on the instance, so it is the reference for checking other solvers
+	def heldKarp(self, time_allowance=60.0):
+		results = {}
+		cities = self._scenario.getCities()
+		solution = None
+		start_time = time.time()
+
+		if len(cities) > HELD_KARP_MAX_CITIES:
+			print(f"Held-Karp is limited to {HELD_KARP_MAX_CITIES} cities")
+		else:
+			found = heldKarp(self._scenario.getCostMatrix(), start_time + time_allowance)
+			if found != None:
+				route, _ = found
+				solution = TSPSolution.fromIndices(route, cities, self._scenario.getCostMatrix())
+
+		# Return results
+		end_time = time.time()
+		results['cost'] = solution.cost if solution != None else math.inf
+		results['time'] = end_time - start_time
+		results['count'] = 1 if solution != None else 0
+		results['solution'] = solution
+		results['max'], results['total'], results['pruned'] = None, None, None
 		return results
 
 
@@ -229,5 +308,187 @@ class TSPSolver:
 		algorithm</returns> 
 	'''
 		
-	def fancy(self,time_allowance=60.0):
-		pass
\ No newline at end of file
+	# Lin-Kernighan style k-opt from the greedy tour until it is locally optimal or time is up, Time: O(x*k*d)
+	# Chains of 2-opt moves in symmetric scenarios, Or-3opt moves (which keep the direction of travel) otherwise, plus
+	# Or-opt moves (see TSPLocalSearch.linKernighan); count is the number of improving moves, as is 'applied', and
+	# 'tried' is how many moves were evaluated. With a sharedBssfCost, improvements are posted there (see _costPoster)
+	def linKernighan(self, time_allowance=60.0, sharedBssfCost=None):
+		results = {}
+		cities = self._scenario.getCities()
+		costMatrix = self._scenario.getCostMatrix()
+		start_time = time.time()
+
+		# Start from the greedy tour, Time: O(n**3) at most
+		seed:TSPSolution = self.greedy(time_allowance=time_allowance * SEED_TIME_FRACTION,
+									   sharedBssfCost=sharedBssfCost)['solution']
+		route, cost, tried, applied = linKernighan(costMatrix, seed.indices, start_time + time_allowance,
+												   symmetric=self._scenario.isSymmetric(),
+												   onImprovement=self._costPoster(sharedBssfCost))
+		solution = TSPSolution.fromIndices(route, cities, costMatrix)
+
+		# Return results
+		end_time = time.time()
+		results['cost'] = cost
+		results['time'] = end_time - start_time
+		results['count'] = applied
+		results['solution'] = solution
+		results['max'], results['total'], results['pruned'] = None, None, None
+		results['tried'], results['applied'] = tried, applied
+		return results
+
+	# Genetic algorithm seeded with the greedy tour until time is up, Time: O(P*n) per generation
+	# The population is one array of routes (see TSPGenetic.geneticAlgorithm); if numWorkers is given, that many
+	# independent populations run in separate processes. count is how many times the best route improved, and the
+	# results also hold 'generations' and 'history', a list of (seconds, best cost) for each improvement
+	# With a sharedBssfCost, a single population posts each improvement there (see _costPoster)
+	def genetic(self, time_allowance=60.0, numWorkers=None, sharedBssfCost=None):
+		results = {}
+		cities = self._scenario.getCities()
+		costMatrix = self._scenario.getCostMatrix()
+		start_time = time.time()
+
+		seed:TSPSolution = self.greedy(time_allowance=time_allowance * SEED_TIME_FRACTION,
+									   sharedBssfCost=sharedBssfCost)['solution']
+		if numWorkers == None or numWorkers <= 1:
+			route, cost, generations, history = geneticAlgorithm(costMatrix, start_time + time_allowance, [seed.indices],
+																  seed=np.random.randint(2**31), startTime=start_time,
+																  onImprovement=self._costPoster(sharedBssfCost))
+		else:
+			route, cost, generations, history = parallelGeneticAlgorithm(costMatrix, start_time + time_allowance, numWorkers,
+																		  [seed.indices], seed=np.random.randint(2**31),
+																		  startTime=start_time)
+		solution = TSPSolution.fromIndices(route, cities, costMatrix)
+
+		# Return results
+		end_time = time.time()
+		results['cost'] = cost
+		results['time'] = end_time - start_time
+		results['count'] = len(history) - 1
+		results['solution'] = solution
+		results['max'], results['total'], results['pruned'] = None, None, None
+		results['generations'], results['history'] = generations, history
+		return results
+
+	# Tour of a large scenario from spatial clusters solved on numWorkers processes (default: one per core) and stitched
+	# together (see TSPDecomposition.decomposedTour), Space: O(n*CLUSTER_SIZE) since the n x n cost matrix is never built
+	# count is the number of clusters
+	def decomposition(self, time_allowance=60.0, numWorkers=None):
+		results = {}
+		cities = self._scenario.getCities()
+		start_time = time.time()
+		numWorkers = os.cpu_count() if numWorkers == None else numWorkers
+
+		route, numClusters = decomposedTour(self._scenario, start_time + time_allowance, numWorkers, startTime=start_time)
+		solution = TSPSolution.fromIndices(route, cities)
+
+		# Return results
+		end_time = time.time()
+		results['cost'] = solution.cost
+		results['time'] = end_time - start_time
+		results['count'] = numClusters
+		results['solution'] = solution
+		results['max'], results['total'], results['pruned'] = None, None, None
+		return results
+
+	# Races the algorithms (TSPSolver method names) in separate processes sharing the best tour cost found so far, and
+	# returns the results of the one with the cheapest solution (see TSPPortfolio.runPortfolio)
+	# 'solver' is the algorithm that won, and 'portfolio' the cost each algorithm reached; if none of them reports a
+	# tour, the results are those of no solution (cost math.inf, solution None) with 'solver' None
+	def portfolio(self, time_allowance=60.0, algorithms=PORTFOLIO_ALGORITHMS):
+		start_time = time.time()
+		results, winner, costs = runPortfolio(self._scenario, time_allowance, algorithms, startTime=start_time)
+		if results == None:
+			results = {'cost': math.inf, 'count': 0, 'solution': None}
+			results['max'], results['total'], results['pruned'] = None, None, None
+		results['time'] = time.time() - start_time
+		results['solver'], results['portfolio'] = winner, costs
+		return results
+
+	# Simulated annealing from the greedy tour until time is up, Time: O(1) per move scored
+	# One chain in this process (see TSPAnnealing.simulatedAnnealing), the temperature cooling over time_allowance;
+	# if numWorkers is given, that many independent chains run in separate processes and the best is kept.
+	# count is moves accepted, and 'rejected' is moves rejected. With a sharedBssfCost, a single chain posts each new
+	# best tour there (see _costPoster)
+	def simulatedAnnealing(self, time_allowance=60.0, numWorkers=None, sharedBssfCost=None):
+		results = {}
+		cities = self._scenario.getCities()
+		costMatrix = self._scenario.getCostMatrix()
+		start_time = time.time()
+
+		seed:TSPSolution = self.greedy(time_allowance=time_allowance * SEED_TIME_FRACTION,
+									   sharedBssfCost=sharedBssfCost)['solution']
+		if numWorkers == None or numWorkers <= 1:
+			route, cost, accepted, rejected = simulatedAnnealing(costMatrix, start_time + time_allowance, seed.indices,
+																 seed=np.random.randint(2**31), startTime=start_time,
+																 onImprovement=self._costPoster(sharedBssfCost))
+		else:
+			route, cost, accepted, rejected = parallelAnnealing(costMatrix, start_time + time_allowance, numWorkers,
+																seed.indices, seed=np.random.randint(2**31),
+																startTime=start_time)
+		solution = TSPSolution.fromIndices(route, cities, costMatrix)
+		if solution.cost > seed.cost:
+			solution = seed
+
+		# Return results
+		end_time = time.time()
+		results['cost'] = solution.cost
+		results['time'] = end_time - start_time
+		results['count'] = accepted
+		results['solution'] = solution
+		results['max'], results['total'], results['pruned'] = None, None, None
+		results['rejected'] = rejected
+		return results
+
+	# Ant colony system until time is up, Time: O(m*n**2) per generation of m ants
+	# Pheromone and visibility are matrices over the cost matrix (see TSPAntColony.antColony), starting from the greedy
+	# tour's cost; count is how many times the best route improved, and 'generations' how many generations ran
+	# With a sharedBssfCost, each improvement is posted there (see _costPoster)
+	def antColony(self, time_allowance=60.0, sharedBssfCost=None):
+		results = {}
+		cities = self._scenario.getCities()
+		costMatrix = self._scenario.getCostMatrix()
+		start_time = time.time()
+
+		seed:TSPSolution = self.greedy(time_allowance=time_allowance * SEED_TIME_FRACTION,
+									   sharedBssfCost=sharedBssfCost)['solution']
+		route, cost, generations, improvements = antColony(costMatrix, start_time + time_allowance, seed.indices,
+														   seed=np.random.randint(2**31),
+														   onImprovement=self._costPoster(sharedBssfCost))
+		solution = TSPSolution.fromIndices(route, cities, costMatrix)
+
+		# Return results
+		end_time = time.time()
+		results['cost'] = cost
+		results['time'] = end_time - start_time
+		results['count'] = improvements
+		results['solution'] = solution
+		results['max'], results['total'], results['pruned'] = None, None, None
+		results['generations'] = generations
+		return results
+
+	# Local search from the greedy tour until it is locally optimal or time is up, Time: O(x*k) for x cities examined
+	# 2-opt moves in symmetric scenarios, and Or-opt moves (which keep the direction of travel) in all of them, only
+	# to each city's nearest neighbours (see TSPLocalSearch.localSearch); count is the number of improving moves
+	# With a sharedBssfCost, improvements are posted there (see _costPoster)
+	def fancy(self,time_allowance=60.0, sharedBssfCost=None):
+		results = {}
+		cities = self._scenario.getCities()
+		costMatrix = self._scenario.getCostMatrix()
+		start_time = time.time()
+
+		# Start from the greedy tour, Time: O(n**3) at most
+		seed:TSPSolution = self.greedy(time_allowance=time_allowance * SEED_TIME_FRACTION,
+									   sharedBssfCost=sharedBssfCost)['solution']
+		route, cost, improvements = localSearch(costMatrix, seed.indices, start_time + time_allowance,
+												symmetric=self._scenario.isSymmetric(),
+												onImprovement=self._costPoster(sharedBssfCost))
+		solution = TSPSolution.fromIndices(route, cities, costMatrix)
+
+		# Return results
+		end_time = time.time()
+		results['cost'] = cost
+		results['time'] = end_time - start_time
+		results['count'] = improvements
+		results['solution'] = solution
+		results['max'], results['total'], results['pruned'] = None, None, None
+		return results
\ No newline at end of file
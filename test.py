@@ -1,9 +1,26 @@
+import itertools
 import math
+import multiprocessing
+import os
+import random
 import signal
 import sys
+import time
+import numpy as np
 from Proj5GUI import Proj5GUI
-from TSPBranchAndBound import State
-from TSPClasses import City, Scenario
+from TSPAnnealing import _applyMove, _moveDeltas, _nearestNeighbors, _sampleMoves, simulatedAnnealing
+from TSPAntColony import antColony
+from TSPBounds import AssignmentBound, OneTreeBound, oneTreeLowerBound
+from TSPBranchAndBound import ArrayState, BranchAndBoundSearch, Frontier, State, StateNode, TranspositionTable
+from TSPClasses import City, Scenario, TSPSolution
+from TSPConstruction import RANDOM_TOUR_BATCH_CELLS, cheapestInsertionTour, farthestInsertionTour, nearestNeighborTours, randomTours
+from TSPDecomposition import CLUSTER_SIZE, spatialClusters
+from TSPGenetic import geneticAlgorithm, orderCrossover
+from TSPHeldKarp import heldKarp
+from TSPLocalSearch import ArrayTour, linKernighan, localSearch
+import TSPParallelBranchAndBound
+from TSPParallelBranchAndBound import parallelBranchAndBound, postBssfCost
+from TSPSolver import TSPSolver
 
 
 from which_pyqt import PYQT_VER
@@ -32,6 +49,18 @@ def test_should_solve_defaultRandom():
   results = w.solver.defaultRandomTour(max_time)
   assert(results['cost'] < math.inf)
   assert(results['solution'] is not None)
+
+# The lower bound is only found (and shown) when its box is checked
+def test_solve_clicked_lower_bound_opt_in():
+  app = QApplication.instance() or QApplication(sys.argv)
+  w = Proj5GUI()
+  w.generateNetwork()
+  w.algDropDown.setCurrentIndex([name for _, name in Proj5GUI.ALGORITHMS].index('greedy'))
+  w.solveClicked()
+  assert(w.statusBar.currentMessage() == '')
+  w.lowerBoundBox.setChecked(True)
+  w.solveClicked()
+  assert(w.statusBar.currentMessage().startswith('Lower bound:'))
   
 
 # def test_should_solve_greedy():
@@ -178,3 +207,596 @@ def test_should_prune_with_bssf():
   testState = State(cities=cities)
   testState.visitCity(cities[1])
   assert(testState.shouldPrune(bssf=5) == True)
+
+# Builds a Scenario of random cities without the GUI
+def setup_random_scenario(ncities=10, difficulty="Hard (Deterministic)", seed=20):
+  random.seed(seed)
+  np.random.seed(seed)
+  points = [QPointF(random.uniform(-1.5, 1.5), random.uniform(-1.0, 1.0)) for _ in range(ncities)]
+  return Scenario(city_locations=points, difficulty=difficulty, rand_seed=seed)
+
+# Costs of some of the edges match the full matrix, without building it (or the edge matrix) outside Hard mode
+def test_cost_submatrix():
+  for difficulty in ["Easy", "Normal", "Hard (Deterministic)"]:
+    scenario = setup_random_scenario(12, difficulty)
+    indices = np.array([3, 0, 7, 11])
+    submatrix = scenario.costSubmatrix(indices)
+    assert((scenario._edge_matrix is None) == (difficulty != "Hard (Deterministic)"))
+    assert(np.array_equal(submatrix, scenario.getCostMatrix()[np.ix_(indices, indices)]))
+    assert(np.array_equal(scenario.costsBetween(indices, indices[::-1]), scenario.getCostMatrix()[indices, indices[::-1]]))
+
+# The precomputed matrix must match the original per-edge cost formula
+def test_cost_matrix_matches_costTo():
+  for difficulty in ["Easy", "Normal", "Hard (Deterministic)"]:
+    scenario = setup_random_scenario(12, difficulty)
+    cities = scenario.getCities()
+    costMatrix = scenario.getCostMatrix()
+    for city in cities:
+      for otherCity in cities:
+        if not scenario._edge_exists[city._index, otherCity._index]:
+          assert(costMatrix[city._index, otherCity._index] == math.inf)
+          continue
+        cost = math.sqrt((otherCity._x - city._x)**2 + (otherCity._y - city._y)**2)
+        if difficulty != 'Easy':
+          cost = max(cost + otherCity._elevation - city._elevation, 0.0)
+        assert(costMatrix[city._index, otherCity._index] == int(math.ceil(cost * City.MAP_SCALE)))
+        assert(city.costTo(otherCity) == costMatrix[city._index, otherCity._index])
+
+def test_should_solve_greedy():
+  scenario = setup_random_scenario(20)
+  solver = TSPSolver()
+  solver.setupWithScenario(scenario)
+  results = solver.greedy(10)
+  assert(results['cost'] < math.inf)
+  assert(len(set(results['solution'].route)) == 20)
+  assert(results['count'] == 20)
+  assert(results['solution'].cost == results['cost'])
+
+# Each start in the batch matches a one-at-a-time nearest neighbor tour, and the best of them is returned
+def test_nearest_neighbor_tours():
+  costMatrix = setup_random_scenario(12, "Hard (Deterministic)").getCostMatrix()
+  costs = []
+  for start in range(12):
+    route = [start]
+    while len(route) < 12:
+      edgeCosts = [costMatrix[route[-1], j] if j not in route else math.inf for j in range(12)]
+      nextCity = int(np.argmin(edgeCosts))
+      route.append(nextCity if nextCity not in route else min(set(range(12)) - set(route)))
+    costs.append(costMatrix[route, np.roll(route, -1)].sum())
+  route, cost, numTried = nearestNeighborTours(costMatrix, batchCells=40)
+  assert(numTried == 12)
+  assert(cost == min(costs))
+  assert(costMatrix[route, np.roll(route, -1)].sum() == cost)
+  # Past the deadline only the first start runs
+  route, cost, numTried = nearestNeighborTours(costMatrix, deadline=time.time())
+  assert(numTried == 1 and cost == costs[0])
+
+# Assert that the array's values are equal to the matrix's values
+def assert_array_matrix(testMatrixArr, correctMatrixArr):
+  assert(np.array_equal(testMatrixArr, np.array(correctMatrixArr, dtype=float)))
+
+# The array-backed State should reduce/visit exactly like the dict-backed State (matrix from Homework 19)
+def test_array_state_matches_state():
+  _, correctStateMatrix, cities = setup_scenario()
+  testState = ArrayState(cities=cities)
+  assert_array_matrix(testState.matrix, correctStateMatrix)
+  assert(testState.costSoFar == 15)
+
+  childState = testState.copy()
+  childState.visitCity(cities[1])
+  assert_array_matrix(childState.matrix, [[math.inf, math.inf, math.inf, math.inf],
+                                          [math.inf, math.inf, 0, 7],
+                                          [0, math.inf, math.inf, 0],
+                                          [4, math.inf, 0, math.inf]])
+  assert(childState.costSoFar == 24)
+  assert(testState.costSoFar == 15) # copy must not share the matrix
+  assert(testState.routeSoFar == [cities[0]])
+
+  testState.visitCity(cities[2])
+  testState.visitCity(cities[3])
+  testState.visitCity(cities[1])
+  testFinalRoute, testFinalCost = testState.getSolution()
+  assert(testFinalRoute == [cities[0], cities[2], cities[3], cities[1]])
+  assert(testFinalCost == 15)
+  assert(testState.isSolution() == True)
+
+def test_array_state_notSolution():
+  scenario = [[math.inf, 7, 3, 12],
+              [math.inf, math.inf, 6, 14],
+              [5, 8, math.inf, 6],
+              [9, 3, 5, math.inf]]
+  _, _, cities = setup_scenario(scenario)
+  testState = ArrayState(cities=cities)
+  for city in [cities[2], cities[3], cities[1]]:
+    testState.visitCity(city)
+  assert(testState.getSolution() == (None, None))
+  assert(testState.costSoFar == math.inf)
+  assert(testState.shouldPrune() == True)
+
+# Re-reducing only the affected rows/columns must give the same matrix and bound as a full re-reduction
+def test_array_state_incremental_matches_full_reduction():
+  scenario = setup_random_scenario(12)
+  cities = scenario.getCities()
+  for seed in range(5):
+    route = cities[1:]
+    random.Random(seed).shuffle(route)
+    dictState = State(cities=cities)
+    arrayState = ArrayState(cities=cities)
+    for city in route:
+      dictState.visitCity(city)
+      arrayState.visitCity(city)
+      assert(arrayState.costSoFar == dictState.costSoFar)
+      if arrayState.costSoFar == math.inf:
+        break
+      for i in range(len(cities)):
+        for j in range(len(cities)):
+          assert(arrayState._getCell(i, j) == dictState._getCell(i, j))
+
+# Deeper states come off first, then lower bounds, then the earliest pushed
+def test_frontier_order():
+  frontier = Frontier()
+  frontier.push(2, 30, 'a')
+  frontier.push(3, 50, 'b')
+  frontier.push(2, 10, 'c')
+  frontier.push(2, 10, 'd')
+  assert(len(frontier) == 4)
+  assert(frontier.minBound() == 10)
+  assert([frontier.pop() for _ in range(4)] == ['b', 'c', 'd', 'a'])
+  assert(len(frontier) == 0)
+  assert(frontier.minBound() == math.inf)
+
+def test_should_solve_branchAndBound():
+  scenario = setup_random_scenario(10)
+  solver = TSPSolver()
+  solver.setupWithScenario(scenario)
+  results = solver.branchAndBound(10)
+  # The search finished, so the bssf is optimal and the bound proves it
+  assert(results['time'] < 10)
+  assert(results['lowerBound'] == results['cost'])
+  assert(results['cost'] <= solver.greedy(10)['cost'])
+
+# A StateNode rebuilds the same State as visiting its route directly, with or without a cached ancestor
+def test_state_node_materialize():
+  scenario = setup_random_scenario(8, "Normal")
+  cities = scenario.getCities()
+  rootState = ArrayState(cities=cities)
+  rootNode = StateNode(None, 0, rootState.costSoFar)
+  directState = rootState.copy()
+  node, parentNode, parentState = rootNode, None, None
+  for city in [cities[3], cities[1], cities[5]]:
+    parentNode, parentState = node, node.materialize(rootState)
+    directState.visitCity(city)
+    node = StateNode(node, city._index, directState.costSoFar)
+  assert(node.numVisited == 4)
+  assert(node.visitedMask == 0b101011)
+  for state in [node.materialize(rootState), node.materialize(rootState, {parentNode: parentState})]:
+    assert(state.routeSoFar == directState.routeSoFar)
+    assert(state.costSoFar == directState.costSoFar == node.costSoFar)
+    assert(np.array_equal(state.matrix, directState.matrix))
+
+# undoVisit puts the State back exactly the way it was before each visitCity
+def test_array_state_undo_visit():
+  scenario = setup_random_scenario(10)
+  cities = scenario.getCities()
+  testState = ArrayState(cities=cities)
+  snapshots, undoLog = [], []
+  for city in cities[1:] + [cities[0]]:
+    snapshots.append((testState.matrix.copy(), testState.costSoFar, list(testState.routeSoFar), set(testState.unvisitedCitiesSet)))
+    testState.visitCity(city, undoLog)
+  while len(snapshots) != 0:
+    testState.undoVisit(undoLog)
+    matrix, costSoFar, route, unvisited = snapshots.pop()
+    assert(np.array_equal(testState.matrix, matrix))
+    assert(testState.costSoFar == costSoFar)
+    assert(testState.routeSoFar == route)
+    assert(testState.unvisitedCitiesSet == unvisited)
+  assert(testState._isReturnVisitToStart == False)
+
+# A tiny queue budget forces the depth first fallback, which must still find the optimal tour
+def test_hybrid_branchAndBound_matches_branchAndBound():
+  scenario = setup_random_scenario(10, "Normal")
+  solver = TSPSolver()
+  solver.setupWithScenario(scenario)
+  results = solver.branchAndBound(10)
+  hybridResults = solver.hybridBranchAndBound(10, maxQueueSize=5)
+  assert(hybridResults['max'] <= 5 + len(scenario.getCities()))
+  assert(hybridResults['cost'] == results['cost'])
+
+# Splitting the search across processes must still prove the same optimal tour
+def test_parallel_branchAndBound_matches_branchAndBound():
+  scenario = setup_random_scenario(11, "Normal")
+  solver = TSPSolver()
+  solver.setupWithScenario(scenario)
+  results = solver.branchAndBound(20)
+  parallelResults = solver.parallelBranchAndBound(20, numWorkers=2)
+  assert(parallelResults['lowerBound'] == parallelResults['cost'] == results['cost'])
+  assert(parallelResults['total'] > parallelResults['pruned'] > 0)
+
+# A worker that dies is noticed right away, the others' results are kept, and the search is not reported as finished
+def test_parallel_branchAndBound_dead_worker(monkeypatch):
+  scenario = setup_random_scenario(11, "Normal")
+  worker = TSPParallelBranchAndBound._branchAndBoundWorker
+  def dyingWorker(workerIndex, *args):
+    if workerIndex == 0:
+      os._exit(1)
+    worker(workerIndex, *args)
+  monkeypatch.setattr(TSPParallelBranchAndBound, '_branchAndBoundWorker', dyingWorker)
+  start = time.time()
+  stats = parallelBranchAndBound(scenario.getCities(), scenario.getCostMatrix(), math.inf, start + 30, numWorkers=2)
+  assert(time.time() - start < 10)
+  assert(stats['failed'] == 1 and not stats['finished'])
+  assert(stats['count'] > 0 and stats['total'] > stats['pruned'] > 0)
+
+# The whole search, root split included, runs on the cost matrix given rather than the scenario's
+def test_parallel_branchAndBound_cost_matrix():
+  scenario = setup_random_scenario(9, "Hard (Deterministic)")
+  cities = scenario.getCities()
+  costMatrix = scenario.getCostMatrix().T.copy()
+  stats = parallelBranchAndBound(cities, costMatrix, math.inf, time.time() + 20, numWorkers=2)
+  route = [city._index for city in stats['route']]
+  assert(stats['finished'] and costMatrix[route, np.roll(route, -1)].sum() == heldKarp(costMatrix)[1])
+
+# The batched child bounds must match building each child with visitCity
+def test_array_state_child_bounds():
+  scenario = setup_random_scenario(12)
+  cities = scenario.getCities()
+  testState = ArrayState(cities=cities)
+  testState.visitCity(cities[4])
+  for maxBatchCells in [2**22, 300]:
+    childCities, bounds = testState.childBounds(maxBatchCells)
+    assert(set(childCities) == testState.unvisitedCitiesSet)
+    for city, bound in zip(childCities, bounds):
+      childState = testState.copy()
+      childState.visitCity(city)
+      assert(bound == childState.costSoFar)
+
+# Held-Karp finds the Homework 19 optimum (0-2-3-1, cost 15) and agrees with a finished branch and bound
+def test_held_karp():
+  scenario, _, _ = setup_scenario()
+  route, cost = heldKarp(np.array(scenario, dtype=float))
+  assert(route == [0, 2, 3, 1])
+  assert(cost == 15)
+
+  for difficulty in ["Easy", "Normal", "Hard (Deterministic)"]:
+    solver = TSPSolver()
+    solver.setupWithScenario(setup_random_scenario(10, difficulty))
+    results = solver.heldKarp(10)
+    assert(results['cost'] == solver.branchAndBound(10)['cost'])
+    assert(results['solution'].cost == results['cost'])
+
+# No tour at all (city 1 has no way out)
+def test_held_karp_no_tour():
+  scenario = [[math.inf, 7, 3, 12],
+              [math.inf, math.inf, math.inf, math.inf],
+              [5, 8, math.inf, 6],
+              [9, 3, 5, math.inf]]
+  assert(heldKarp(np.array(scenario, dtype=float)) == None)
+
+# Cheapest assignment of the live rows to the live columns of a reduced matrix, by brute force
+def brute_force_assignment(matrix):
+  rows = [i for i in range(len(matrix)) if np.isfinite(matrix[i]).any()]
+  cols = [j for j in range(len(matrix)) if np.isfinite(matrix[:, j]).any()]
+  if len(rows) != len(cols):
+    return math.inf
+  return min(sum(matrix[i, j] for i, j in zip(rows, perm)) for perm in itertools.permutations(cols))
+
+# The assignment bound matches a brute force assignment, whether re-solved from the parent or from scratch
+def test_assignment_bound():
+  scenario = setup_random_scenario(8, "Hard (Deterministic)")
+  cities = scenario.getCities()
+  bound = AssignmentBound(scenario.getCostMatrix())
+  parentState = ArrayState(cities=cities)
+  assert(bound.evaluate(parentState) == parentState.costSoFar + brute_force_assignment(parentState.matrix))
+  assert(bound.evaluate(parentState) <= heldKarp(scenario.getCostMatrix())[1])
+  for city in [cities[5], cities[2], cities[7], cities[1]]:
+    childState = parentState.copy()
+    childState.visitCity(city)
+    incremental = bound.evaluate(childState, parentState)
+    assert(incremental == bound.evaluate(childState.copy()) == bound.evaluate(childState))
+    assert(incremental == childState.costSoFar + brute_force_assignment(childState.matrix))
+    assert(incremental >= childState.costSoFar)
+    parentState = childState
+
+def test_assignment_branchAndBound():
+  scenario = setup_random_scenario(10, "Normal")
+  solver = TSPSolver()
+  solver.setupWithScenario(scenario)
+  results = solver.assignmentBranchAndBound(10)
+  assert(results['cost'] == heldKarp(scenario.getCostMatrix())[1])
+  assert(results['total'] <= solver.branchAndBound(10)['total'])
+
+# The 1-tree bound never beats the best tour that extends a state, on symmetric or asymmetric costs
+def test_one_tree_bound():
+  for difficulty in ["Easy", "Hard (Deterministic)"]:
+    scenario = setup_random_scenario(8, difficulty)
+    cities = scenario.getCities()
+    costMatrix = scenario.getCostMatrix()
+    optimum = heldKarp(costMatrix)[1]
+    assert(oneTreeLowerBound(costMatrix, optimum)[0] <= optimum)
+    bound = OneTreeBound(costMatrix, upperBound=optimum)
+    for first, second in [(1, 2), (3, 7), (6, 4)]:
+      state = ArrayState(cities=cities)
+      state.visitCity(cities[first])
+      state.visitCity(cities[second])
+      rest = [i for i in range(1, 8) if i not in (first, second)]
+      best = min(TSPSolution([cities[i] for i in [0, first, second] + list(perm)]).cost for perm in itertools.permutations(rest))
+      assert(state.costSoFar <= bound.evaluate(state) <= best)
+
+def test_oneTree_branchAndBound():
+  scenario = setup_random_scenario(12, "Easy")
+  solver = TSPSolver()
+  solver.setupWithScenario(scenario)
+  results = solver.addLowerBound(solver.oneTreeBranchAndBound(10))
+  assert(results['cost'] == heldKarp(scenario.getCostMatrix())[1])
+  assert(results['lowerBound'] == results['cost'])
+  assert(results['gap'] == 0)
+
+# Without time for any tuning, the lower bound still comes from the first 1-tree (or is 0 with no iterations)
+def test_lower_bound_no_time():
+  scenario = setup_random_scenario(12, "Easy")
+  solver = TSPSolver()
+  solver.setupWithScenario(scenario)
+  results = solver.addLowerBound(solver.greedy(10), time_allowance=0)
+  assert(0 < results['lowerBound'] <= results['cost'] and results['gap'] != None)
+  assert(oneTreeLowerBound(scenario.getCostMatrix(), iterations=0)[0] == 0)
+
+# With a bssf just above the optimum, edge elimination removes edges but none on the optimal route
+def test_edge_elimination():
+  scenario = setup_random_scenario(10, "Hard (Deterministic)")
+  cities = scenario.getCities()
+  route, optimum = heldKarp(scenario.getCostMatrix())
+  rootState = ArrayState(cities=cities)
+  search = BranchAndBoundSearch(rootState, optimum + 1)
+  assert(search.eliminatedEdges > 0)
+  assert(np.isfinite(rootState.matrix[route, np.roll(route, -1)]).all())
+  search.pushRoute()
+  assert(search.run(math.inf))
+  assert(search.bssfCost == optimum)
+
+# Only the cheapest path to a (visited cities, last city) pair survives, and the oldest entries are evicted
+def test_transposition_table():
+  table = TranspositionTable(2)
+  assert(table.record(0b0111, 2, 10))
+  assert(not table.record(0b0111, 2, 10))
+  assert(not table.isDominated(0b0111, 2, 10))
+  assert(table.record(0b0111, 2, 8))
+  assert(table.isDominated(0b0111, 2, 10))
+  assert(table.hits == 2)
+  assert(table.record(0b1011, 3, 5))
+  assert(table.record(0b1101, 3, 5))
+  assert(len(table) == 2)
+  assert(table.record(0b0111, 2, 12)) # Evicted, so it is recorded again
+
+# Easy scenarios are symmetric, and fixing the direction of the route keeps the optimum with fewer states
+def test_symmetric_branchAndBound():
+  assert(not setup_random_scenario(10, "Normal").isSymmetric())
+  scenario = setup_random_scenario(12, "Easy")
+  assert(scenario.isSymmetric())
+  optimum = heldKarp(scenario.getCostMatrix())[1]
+  totals = []
+  for symmetric in [False, True]:
+    search = BranchAndBoundSearch(ArrayState(cities=scenario.getCities()), symmetric=symmetric)
+    search.pushRoute()
+    assert(search.run(math.inf))
+    assert(search.bssfCost == optimum)
+    totals.append(search.totalStatesCreated)
+  assert(totals[1] < totals[0])
+
+# Random tours are sampled and scored a batch at a time until a batch has a valid one
+def test_random_tours():
+  scenario = setup_random_scenario(30, "Hard (Deterministic)")
+  costMatrix = scenario.getCostMatrix()
+  route, cost, numTried = randomTours(costMatrix)
+  assert(sorted(route) == list(range(30)))
+  assert(cost == costMatrix[route, np.roll(route, -1)].sum() < math.inf)
+  assert(numTried % (RANDOM_TOUR_BATCH_CELLS // 30) == 0)
+  solver = TSPSolver()
+  solver.setupWithScenario(scenario)
+  results = solver.defaultRandomTour(10)
+  assert(results['solution'].cost == results['cost'] < math.inf)
+  assert(results['count'] >= 1)
+
+# Insertion tours are valid, and branch and bound starts from the cheapest of its seeders
+def test_insertion_tours():
+  scenario = setup_random_scenario(30, "Hard (Deterministic)")
+  costMatrix = scenario.getCostMatrix()
+  for buildTour in (cheapestInsertionTour, farthestInsertionTour):
+    route, cost = buildTour(costMatrix)
+    assert(sorted(route) == list(range(30)))
+    assert(cost == costMatrix[route, np.roll(route, -1)].sum() < math.inf)
+  solver = TSPSolver()
+  solver.setupWithScenario(scenario)
+  seedCosts = [solver.greedy(10)['cost'], solver.cheapestInsertion(10)['cost'], solver.farthestInsertion(10)['cost']]
+  assert(solver._seedBssf(10).cost == min(seedCosts))
+  assert(solver._seedBssf(10, seeders=('greedy',)).cost == seedCosts[0])
+  assert(solver.branchAndBound(1)['cost'] <= min(seedCosts))
+
+# Index-backed solutions match City-list ones, and the O(1) move deltas match recomputing the cost
+def test_solution_from_indices():
+  scenario = setup_random_scenario(12, "Normal")
+  cities = scenario.getCities()
+  order = list(np.random.permutation(12))
+  solution = TSPSolution.fromIndices(order, cities)
+  listSolution = TSPSolution([cities[i] for i in order])
+  assert(solution.indices.dtype == np.int32)
+  assert(solution.cost == listSolution.cost)
+  assert(solution.route == listSolution.route)
+  assert(solution.enumerateEdges() == listSolution.enumerateEdges())
+
+# Annealing's O(1) move deltas match recomputing the route's cost
+def test_annealing_move_deltas():
+  costMatrix = setup_random_scenario(12, "Normal").getCostMatrix()
+  route = np.random.permutation(12)
+  positions = np.argsort(route)
+  neighbors = _nearestNeighbors(costMatrix)
+  for near in [(), (route, positions, neighbors)]:
+    kinds, first, second, lengths = _sampleMoves(12, 200, np.random.default_rng(1), *near)
+    deltas = _moveDeltas(costMatrix, route, kinds, first, second, lengths)
+    for move in range(200):
+      moved = _applyMove(route.copy(), kinds[move], first[move], second[move], lengths[move])
+      assert(sorted(moved.tolist()) == list(range(12)))
+      assert(deltas[move] == costMatrix[moved, np.roll(moved, -1)].sum() - costMatrix[route, np.roll(route, -1)].sum())
+
+def test_array_tour():
+  tour = ArrayTour([0, 1, 2, 3, 4, 5, 6, 7])
+  tour.reverse(2, 5)
+  assert(tour.route.tolist() == [0, 1, 5, 4, 3, 2, 6, 7])
+  tour.reverse(6, 1) # Wraps around, so the rest of the tour is reversed instead
+  assert(tour.route.tolist() == [0, 1, 2, 3, 4, 5, 6, 7])
+  tour.moveSegment(7, 2, 3) # 7 and 0 (wrapping around) go after 3
+  assert(tour.route.tolist() == [1, 2, 3, 7, 0, 4, 5, 6])
+  assert(tour.next(6) == 1 and tour.prev(1) == 6)
+  assert((tour.position[tour.route] == np.arange(8)).all())
+
+# Local search only ever improves the greedy tour, and the route it returns has the cost it reports
+def test_fancy_local_search():
+  for difficulty in ["Easy", "Normal", "Hard (Deterministic)"]:
+    scenario = setup_random_scenario(60, difficulty)
+    solver = TSPSolver()
+    solver.setupWithScenario(scenario)
+    greedyCost = solver.greedy(10)['cost']
+    results = solver.fancy(10)
+    assert(results['count'] > 0)
+    assert(results['cost'] < greedyCost)
+    assert(results['solution'].cost == results['cost'])
+    assert(sorted(results['solution'].indices.tolist()) == list(range(60)))
+
+# Every k-opt move applied must lower the cost, on symmetric and asymmetric costs
+def test_lin_kernighan():
+  for difficulty in ["Easy", "Normal", "Hard (Deterministic)"]:
+    scenario = setup_random_scenario(80, difficulty)
+    costMatrix = scenario.getCostMatrix()
+    start = list(range(80))
+    startCost = costMatrix[start, np.roll(start, -1)].sum()
+    route, cost, tried, applied = linKernighan(costMatrix, start, symmetric=scenario.isSymmetric())
+    assert(sorted(route) == start)
+    assert(cost == costMatrix[route, np.roll(route, -1)].sum())
+    assert(applied > 0 and tried >= applied)
+    assert(cost < startCost)
+  solver = TSPSolver()
+  solver.setupWithScenario(setup_random_scenario(60, "Normal"))
+  results = solver.linKernighan(10)
+  assert(results['solution'].cost == results['cost'] <= solver.greedy(10)['cost'])
+
+# Batched order crossover keeps each first parent's slice in place and makes valid routes
+def test_order_crossover():
+  rng = np.random.default_rng(3)
+  firstParents = rng.random((50, 12)).argsort(axis=1)
+  secondParents = rng.random((50, 12)).argsort(axis=1)
+  children = orderCrossover(firstParents, secondParents, rng)
+  for first, second, child in zip(firstParents, secondParents, children):
+    assert(sorted(child.tolist()) == list(range(12)))
+    kept = child == first
+    # The cities not kept from the first parent are in the second parent's order (from after the slice)
+    rest = [city for city in child.tolist() if city not in first[kept]]
+    assert(rest == sorted(rest, key=lambda city: (list(second).index(city) - list(second).index(rest[0])) % 12))
+
+def test_genetic():
+  scenario = setup_random_scenario(30, "Hard (Deterministic)")
+  costMatrix = scenario.getCostMatrix()
+  route, cost, generations, history = geneticAlgorithm(costMatrix, time.time() + 1, seed=1)
+  assert(sorted(route) == list(range(30)))
+  assert(cost == costMatrix[route, np.roll(route, -1)].sum() == history[-1][1])
+  assert(generations > 0)
+  assert([best for _, best in history] == sorted([best for _, best in history], reverse=True))
+  solver = TSPSolver()
+  solver.setupWithScenario(scenario)
+  results = solver.genetic(2, numWorkers=2)
+  assert(results['solution'].cost == results['cost'] <= solver.greedy(10)['cost'])
+
+def test_ant_colony():
+  scenario = setup_random_scenario(30, "Hard (Deterministic)")
+  costMatrix = scenario.getCostMatrix()
+  greedyRoute, greedyCost, _ = nearestNeighborTours(costMatrix)
+  route, cost, generations, improvements = antColony(costMatrix, time.time() + 1, greedyRoute, seed=1)
+  assert(sorted(route) == list(range(30)))
+  assert(cost == costMatrix[route, np.roll(route, -1)].sum() <= greedyCost)
+  assert(generations > 0)
+  solver = TSPSolver()
+  solver.setupWithScenario(scenario)
+  results = solver.antColony(1)
+  assert(results['solution'].cost == results['cost'] <= greedyCost)
+
+def test_simulated_annealing():
+  scenario = setup_random_scenario(30, "Hard (Deterministic)")
+  costMatrix = scenario.getCostMatrix()
+  greedyRoute, greedyCost, _ = nearestNeighborTours(costMatrix)
+  route, cost, accepted, rejected = simulatedAnnealing(costMatrix, time.time() + 1, greedyRoute, seed=1)
+  assert(sorted(route) == list(range(30)))
+  assert(cost == costMatrix[route, np.roll(route, -1)].sum() <= greedyCost)
+  assert(accepted > 0 and rejected > 0)
+  solver = TSPSolver()
+  solver.setupWithScenario(scenario)
+  results = solver.simulatedAnnealing(2, numWorkers=2)
+  assert(results['solution'].cost == results['cost'] <= greedyCost)
+
+# One chain by default, which improves on the greedy tour even on a short budget
+def test_simulated_annealing_short_budget():
+  scenario = setup_random_scenario(200, "Easy")
+  solver = TSPSolver()
+  solver.setupWithScenario(scenario)
+  greedyCost = solver.greedy(1)['cost']
+  results = solver.simulatedAnnealing(1)
+  assert(results['solution'].cost == results['cost'] < greedyCost)
+
+# Branch and bound prunes with a cost another process posts to the shared bssf, and the heuristics post each
+# improvement as they find it
+def test_shared_bssf_cost():
+  scenario = setup_random_scenario(16, "Hard (Deterministic)")
+  solver = TSPSolver()
+  solver.setupWithScenario(scenario)
+  alone = solver.branchAndBound(60, seeders=('greedy',))
+  sharedBssfCost = multiprocessing.Value('d', math.inf)
+  poster = multiprocessing.Process(target=postBssfCost, args=(sharedBssfCost, alone['cost']))
+  poster.start()
+  poster.join()
+  assert(sharedBssfCost.value == alone['cost'])
+  shared = solver.branchAndBound(60, seeders=('greedy',), sharedBssfCost=sharedBssfCost)
+  assert(shared['count'] == 0 and shared['cost'] == solver.greedy(60)['cost'] > alone['cost'])
+  assert(shared['total'] < alone['total'])
+
+  costMatrix = scenario.getCostMatrix()
+  greedyRoute, greedyCost, _ = nearestNeighborTours(costMatrix)
+  posted = []
+  _, cost, _, _ = simulatedAnnealing(costMatrix, time.time() + 0.5, greedyRoute, seed=1, onImprovement=posted.append)
+  assert(len(posted) > 0 and posted == sorted(posted, reverse=True) and posted[-1] == cost < greedyCost)
+  sharedBssfCost = multiprocessing.Value('d', math.inf)
+  results = solver.linKernighan(1, sharedBssfCost=sharedBssfCost)
+  assert(sharedBssfCost.value == results['cost'] < greedyCost)
+
+def test_portfolio():
+  scenario = setup_random_scenario(12, "Hard (Deterministic)")
+  solver = TSPSolver()
+  solver.setupWithScenario(scenario)
+  results = solver.portfolio(2, algorithms=('greedy', 'cheapestInsertion', 'branchAndBound'))
+  assert(set(results['portfolio']) == {'greedy', 'cheapestInsertion', 'branchAndBound'})
+  assert(results['solution'].cost == results['cost'] == min(results['portfolio'].values()))
+  assert(results['portfolio'][results['solver']] == results['cost'])
+  assert(results['cost'] == solver.heldKarp(10)['cost'])
+
+# A solver that exits without reporting doesn't lose the others' results, and with no results there is no solution
+def test_portfolio_missing_results():
+  scenario = setup_random_scenario(12, "Hard (Deterministic)")
+  solver = TSPSolver()
+  solver.setupWithScenario(scenario)
+  results = solver.portfolio(1, algorithms=('noSuchSolver', 'greedy'))
+  assert(results['solver'] == 'greedy' and results['portfolio'] == {'greedy': results['cost']})
+  results = solver.portfolio(1, algorithms=('noSuchSolver',))
+  assert(results['cost'] == math.inf and results['solution'] == None and results['solver'] == None)
+  assert(results['count'] == 0 and results['portfolio'] == {} and results['time'] < 5)
+
+def test_decomposition():
+  scenario = setup_random_scenario(2 * CLUSTER_SIZE + 100, "Normal")
+  xs, ys, _ = scenario.cityCoordinates()
+  clusters = spatialClusters(xs, ys)
+  assert(len(clusters) == 4 and all(len(cluster) <= CLUSTER_SIZE for cluster in clusters))
+  assert(sorted(np.concatenate(clusters).tolist()) == list(range(2 * CLUSTER_SIZE + 100)))
+  solver = TSPSolver()
+  solver.setupWithScenario(scenario)
+  results = solver.decomposition(10, numWorkers=2)
+  assert(results['count'] == 4)
+  assert(sorted(results['solution'].indices.tolist()) == list(range(2 * CLUSTER_SIZE + 100)))
+  assert(scenario._cost_matrix is None and scenario._edge_matrix is None)
+  costMatrix = scenario.getCostMatrix()
+  route = results['solution'].indices
+  assert(results['cost'] == costMatrix[route, np.roll(route, -1)].sum() < solver.greedy(10)['cost'])